@@ -0,0 +1,340 @@
+"""
+Weather Alerts for Weather App
+Threshold rules on forecast fields, evaluated in batch per city
+
+Rules are grouped by (city, field, operator, day) and each group keeps its
+thresholds sorted, so evaluating a city costs one binary search per group
+plus the number of rules that fire - independent of how many rules in
+that group stay quiet. A scheduler fetches each distinct city once per
+cycle through WeatherService (sharing its payload cache) and pushes fired
+alerts onto a local delivery queue drained into a JSON-lines file.
+"""
+
+import bisect
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import AlertRule, ForecastDay
+from utils.app_logger import logger
+
+
+def normalize_city(city: str) -> str:
+    """Group key for rules on the same city typed differently"""
+    return ' '.join(city.lower().split())
+
+
+class AlertStore:
+    """Persists alert rules in a JSON file keyed by rule ID"""
+
+    ALERTS_FILE = 'alerts.json'
+
+    def __init__(self, alerts_file: Optional[str] = None):
+        """
+        Initialize AlertStore
+
+        Args:
+            alerts_file: Path to the rules JSON file (defaults to ALERTS_FILE)
+        """
+        if alerts_file:
+            self.ALERTS_FILE = alerts_file
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self.rules: Dict[str, AlertRule] = {}
+        self.reload_if_changed()
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.ALERTS_FILE)
+        except OSError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload rules if another process rewrote the file
+
+        Returns:
+            True if rules were (re)loaded
+        """
+        mtime = self._file_mtime()
+        if mtime is not None and mtime == self._mtime:
+            return False
+        with self._lock:
+            try:
+                if mtime is None:
+                    self.rules = {}
+                else:
+                    with open(self.ALERTS_FILE, 'r') as f:
+                        raw = json.load(f)
+                    self.rules = {rule_id: AlertRule.from_dict(rule_id, data) for rule_id, data in raw.items()}
+                    logger.info(f"Loaded {len(self.rules)} alert rules from {self.ALERTS_FILE}")
+                self._mtime = mtime
+                return True
+            except (json.JSONDecodeError, KeyError, ValueError) as e:
+                logger.error(f"Error decoding alert rules from {self.ALERTS_FILE}: {e}")
+                return False
+            except IOError as e:
+                logger.error(f"IO Error reading {self.ALERTS_FILE}: {e}")
+                return False
+
+    def _save(self) -> None:
+        tmp_file = f"{self.ALERTS_FILE}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump({rule_id: rule.to_dict() for rule_id, rule in self.rules.items()}, f)
+            os.replace(tmp_file, self.ALERTS_FILE)
+            self._mtime = self._file_mtime()
+        except IOError as e:
+            logger.error(f"IO Error writing to {self.ALERTS_FILE}: {e}")
+            raise
+
+    def add_rule(self, user_email: str, city: str, field: str, operator: str,
+                 threshold: float, day_offset: Optional[int] = None) -> AlertRule:
+        """
+        Create and persist a rule
+
+        Raises:
+            ValueError: If field or operator is not supported
+        """
+        self.reload_if_changed()
+        rule = AlertRule(uuid.uuid4().hex[:12], user_email, city.strip(), field, operator, threshold, day_offset)
+        with self._lock:
+            self.rules[rule.rule_id] = rule
+            self._save()
+        logger.info(f"Alert rule {rule.rule_id} created for {user_email}: {rule}")
+        return rule
+
+    def delete_rule(self, rule_id: str, user_email: str) -> bool:
+        """Delete a rule owned by user_email"""
+        self.reload_if_changed()
+        with self._lock:
+            rule = self.rules.get(rule_id)
+            if rule is None or rule.user_email != user_email:
+                return False
+            del self.rules[rule_id]
+            self._save()
+        logger.info(f"Alert rule {rule_id} deleted by {user_email}")
+        return True
+
+    def rules_for_user(self, user_email: str) -> List[AlertRule]:
+        """Rules owned by one user, oldest first"""
+        self.reload_if_changed()
+        return sorted((r for r in self.rules.values() if r.user_email == user_email),
+                      key=lambda r: r.created_at)
+
+
+class _ThresholdGroup:
+    """Rules sharing (field, operator, day_offset) for one city, sorted by threshold"""
+
+    __slots__ = ('thresholds', 'rule_ids')
+
+    def __init__(self, pairs: List[Tuple[float, str]]):
+        pairs.sort()
+        self.thresholds = [t for t, _ in pairs]
+        self.rule_ids = [r for _, r in pairs]
+
+    def matching(self, operator: str, value: float) -> List[str]:
+        """IDs of rules for which `value <operator> threshold` holds"""
+        if operator == '>':
+            return self.rule_ids[:bisect.bisect_left(self.thresholds, value)]
+        if operator == '>=':
+            return self.rule_ids[:bisect.bisect_right(self.thresholds, value)]
+        if operator == '<':
+            return self.rule_ids[bisect.bisect_right(self.thresholds, value):]
+        return self.rule_ids[bisect.bisect_left(self.thresholds, value):]
+
+
+class AlertEngine:
+    """Evaluates every rule of a city against one forecast in a single pass"""
+
+    def __init__(self, rules: Iterable[AlertRule]):
+        """
+        Build the per-city threshold index
+
+        Args:
+            rules: All active rules
+        """
+        grouped: Dict[str, Dict[Tuple[str, str, Optional[int]], List[Tuple[float, str]]]] = {}
+        for rule in rules:
+            key = (rule.field, rule.operator, rule.day_offset)
+            grouped.setdefault(normalize_city(rule.city), {}).setdefault(key, []).append(
+                (rule.threshold, rule.rule_id)
+            )
+        self._index = {
+            city: {key: _ThresholdGroup(pairs) for key, pairs in groups.items()}
+            for city, groups in grouped.items()
+        }
+        self.rule_count = sum(len(g.rule_ids) for groups in self._index.values() for g in groups.values())
+
+    def cities(self) -> List[str]:
+        """Distinct normalized cities having at least one rule"""
+        return list(self._index)
+
+    def evaluate(self, city: str, forecast: List[ForecastDay]) -> List[Dict]:
+        """
+        Evaluate all rules of a city
+
+        Rules with a day_offset test that forecast day; rules without one
+        fire if any forecast day crosses the threshold, tested against the
+        day with the extreme value in the operator's direction.
+
+        Args:
+            city: City name (normalized internally)
+            forecast: ForecastDay list from WeatherService.get_forecast
+
+        Returns:
+            One dict per fired rule with rule_id, field, value and date
+        """
+        groups = self._index.get(normalize_city(city))
+        if not groups or not forecast:
+            return []
+
+        # Transpose once: field -> [(value, date), ...] in day order
+        columns = {
+            field: [(getattr(day, field, 0), day.date) for day in forecast]
+            for field in {key[0] for key in groups}
+        }
+
+        fired = []
+        for (field, operator, day_offset), group in groups.items():
+            column = columns[field]
+            if day_offset is None:
+                value, date = (max(column) if operator in ('>', '>=') else min(column))
+            elif day_offset < len(column):
+                value, date = column[day_offset]
+            else:
+                continue
+            for rule_id in group.matching(operator, value):
+                fired.append({'rule_id': rule_id, 'field': field, 'value': value, 'date': date})
+        return fired
+
+
+class JsonLinesAlertSink:
+    """Delivery queue drained by a background thread into a JSON-lines file"""
+
+    def __init__(self, path: str = os.path.join('logs', 'alerts.jsonl'), max_queue: int = 100000):
+        """
+        Initialize JsonLinesAlertSink
+
+        Args:
+            path: File receiving one JSON object per delivered alert
+            max_queue: Alerts buffered before deliver() blocks
+        """
+        self.path = path
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='alert-delivery', daemon=True)
+        self._thread.start()
+
+    def deliver(self, alerts: List[Dict]) -> None:
+        """Queue a batch of alerts for delivery"""
+        if alerts:
+            self._queue.put(alerts)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'a') as f:
+                    for alert in batch:
+                        f.write(json.dumps(alert) + '\n')
+            except IOError as e:
+                logger.error(f"IO Error delivering {len(batch)} alerts to {self.path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued alert has been written"""
+        self._queue.join()
+
+
+class AlertScheduler:
+    """Runs evaluation cycles: one forecast fetch per distinct city, all rules per fetch"""
+
+    def __init__(self, weather_service, store: AlertStore, sink: JsonLinesAlertSink,
+                 interval: float = 900):
+        """
+        Initialize AlertScheduler
+
+        Args:
+            weather_service: WeatherService used to fetch forecasts
+            store: AlertStore holding the rules
+            sink: Delivery target for fired alerts
+            interval: Seconds between cycles
+        """
+        self.weather_service = weather_service
+        self.store = store
+        self.sink = sink
+        self.interval = interval
+        self._engine: Optional[AlertEngine] = None
+        self._delivered: Dict[str, str] = {}  # rule_id -> forecast date already notified
+
+    def _current_engine(self) -> AlertEngine:
+        if self.store.reload_if_changed() or self._engine is None:
+            self._engine = AlertEngine(self.store.rules.values())
+            logger.info(f"Alert engine indexed {self._engine.rule_count} rules "
+                        f"across {len(self._engine.cities())} cities")
+        return self._engine
+
+    def run_once(self) -> Dict:
+        """
+        Run one evaluation cycle
+
+        Returns:
+            Cycle statistics (cities, fetch failures, rules fired, seconds)
+        """
+        started = time.perf_counter()
+        engine = self._current_engine()
+        rules = self.store.rules
+        fired_total = 0
+        failures = 0
+
+        for city in engine.cities():
+            forecast = self.weather_service.get_forecast(city)
+            if not forecast:
+                failures += 1
+                continue
+            batch = []
+            for hit in engine.evaluate(city, forecast):
+                rule = rules.get(hit['rule_id'])
+                if rule is None or self._delivered.get(rule.rule_id) == hit['date']:
+                    continue
+                self._delivered[rule.rule_id] = hit['date']
+                batch.append({
+                    'rule_id': rule.rule_id,
+                    'user_email': rule.user_email,
+                    'city': rule.city,
+                    'field': rule.field,
+                    'operator': rule.operator,
+                    'threshold': rule.threshold,
+                    'value': hit['value'],
+                    'date': hit['date'],
+                    'triggered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                })
+            self.sink.deliver(batch)
+            fired_total += len(batch)
+
+        stats = {
+            'cities': len(engine.cities()),
+            'fetch_failures': failures,
+            'fired': fired_total,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"Alert cycle complete: {stats}")
+        return stats
+
+    def run_forever(self) -> None:
+        """Run cycles every `interval` seconds until interrupted"""
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error in alert cycle: {e}", exc_info=True)
+            time.sleep(self.interval)
@@ -3,25 +3,158 @@ Weather App - Main Application with Modular Architecture
 Uses object-oriented design with Service Layer pattern
 """
 
-from flask import Flask, render_template, request, redirect, url_for, session
+from flask import (Flask, Response, current_app, g, jsonify, render_template, request, redirect, stream_template,
+                   url_for, session)
+from typing import Dict, Optional
 from constant.header import API_KEY
-from utils.app_logger import logger
-from services import UserService, WeatherService
+from utils.app_logger import logger, configure_logging
+from services import ServiceRegistry, UserService, WeatherService
+from history import METRICS, HistoryService, ObservationStore, build_trend_chart
+from alerts import AlertScheduler, AlertStore, JsonLinesAlertSink
+from geo import CITIES_FILE, CityIndex
+from models import AlertRule
+from utils.profiler import RequestProfiler, StackSampler
+from utils.admission import AdmissionController
+from utils.deadline import Deadline
+from utils.hedging import HedgeBudget, HedgedRequester
+from utils.units import PREFERENCE_OPTIONS, get_formatter, normalize_preferences
 from datetime import datetime
+import click
+import math
 import os
+import time
 
-# ==================== App Initialization ====================
+# ==================== Configuration ====================
 
-app = Flask(__name__)
-app.secret_key = 'your_secret_key_here_change_in_production'
+DEFAULT_CONFIG = {
+    'SECRET_KEY': 'your_secret_key_here_change_in_production',
+    'OPENWEATHER_API_KEY': API_KEY,
+    'USERS_FILE': UserService.USERS_FILE,
+    'LOG_DIR': os.environ.get('WEATHER_LOG_DIR', 'logs'),
+    'HISTORY_DIR': os.path.join('data', 'history'),
+    'HISTORY_SEGMENT_ROWS': 4096,
+    'HISTORY_RETENTION_DAYS': 30,
+    'HISTORY_TREND_HOURS': 24,
+    'ALERTS_FILE': AlertStore.ALERTS_FILE,
+    'ALERTS_DELIVERY_FILE': os.path.join('logs', 'alerts.jsonl'),
+    'ALERTS_INTERVAL': 900,
+    'CITIES_FILE': CITIES_FILE,
+    'NEARBY_SNAP_KM': 30,
+    'NEARBY_RADIUS_KM': 500,
+    'NEARBY_MAX_RESULTS': 8,
+    'ADMIN_EMAILS': [],
+    'PROFILER_ENABLED': False,
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_HEADER': 'X-Profile-Request',
+    'PROFILE_MAX_SAMPLER_SECONDS': 120,
+    # Hard bound on upstream waiting per page, shared by every call it makes
+    'PAGE_DEADLINE_SECONDS': 8.0,
+    'HEDGE_REQUESTS': False,
+    'HEDGE_PERCENTILE': 95,
+    'HEDGE_BUDGET_RATIO': 0.05,
+    # Stream result pages as they render; the forecast strip loads as a fragment
+    'PROGRESSIVE_RENDERING': True,
+    'FORECAST_FRAGMENT_MAX_AGE': 300,
+    'ADMISSION_ENABLED': True,
+    # Upstream-bound route classes; running + queued requests must stay below
+    # the server's threads per worker (24) so cheap routes always find a thread.
+    # Every result page loads a forecast fragment, so forecast traffic matches
+    # current-weather traffic (20 of 24 threads, 4 left for cheap routes)
+    'ADMISSION_POOLS': {
+        'current': {'max_concurrent': 6, 'max_queue': 4, 'queue_timeout': 2.0},
+        'forecast': {'max_concurrent': 6, 'max_queue': 4, 'queue_timeout': 2.0},
+    },
+    # endpoint -> (route class, WeatherService cache endpoint)
+    'ADMISSION_ROUTES': {
+        'weather': ('current', 'weather'),
+        'weather_nearby': ('current', 'weather'),
+        'forecast': ('forecast', 'forecast'),
+        'forecast_fragment': ('forecast', 'forecast'),
+    },
+}
 
-# Initialize services
-user_service = UserService()
-weather_service = WeatherService(API_KEY)
+# ==================== Service Access ====================
+
+def get_services() -> ServiceRegistry:
+    """Return the service registry of the current application"""
+    return current_app.extensions['weather_services']
+
+
+def get_user_service() -> UserService:
+    """Return the (lazily constructed) UserService of the current application"""
+    return get_services().get('user_service')
+
+
+def get_weather_service() -> WeatherService:
+    """Return the (lazily constructed) WeatherService of the current application"""
+    return get_services().get('weather_service')
+
+
+def get_history_service() -> HistoryService:
+    """Return the (lazily constructed) HistoryService of the current application"""
+    return get_services().get('history_service')
+
+
+def get_alert_store() -> AlertStore:
+    """Return the (lazily constructed) AlertStore of the current application"""
+    return get_services().get('alert_store')
+
+
+def get_city_index() -> CityIndex:
+    """Return the (lazily constructed) CityIndex of the current application"""
+    return get_services().get('city_index')
+
+
+def _build_registry(app: Flask) -> ServiceRegistry:
+    """Register service factories that read their settings from app.config"""
+    config = app.config
+    registry = ServiceRegistry()
+    registry.register('user_service', lambda: UserService(config['USERS_FILE']))
+    registry.register('alert_store', lambda: AlertStore(config['ALERTS_FILE']))
+    registry.register('history_service', lambda: HistoryService(ObservationStore(
+        config['HISTORY_DIR'],
+        segment_rows=config['HISTORY_SEGMENT_ROWS'],
+        retention_seconds=config['HISTORY_RETENTION_DAYS'] * 24 * 3600,
+    )))
+    registry.register('city_index', lambda: CityIndex.from_csv(config['CITIES_FILE']))
+    
+    def on_observation(weather) -> None:
+        registry.get('history_service').record(weather)
+        registry.get('city_index').add(weather.city, weather.country, weather.latitude, weather.longitude)
+    
+    registry.register('weather_service', lambda: WeatherService(
+        config['OPENWEATHER_API_KEY'],
+        on_observation=on_observation,
+        requester=HedgedRequester(
+            hedging=config['HEDGE_REQUESTS'],
+            percentile=config['HEDGE_PERCENTILE'],
+            budget=HedgeBudget(config['HEDGE_BUDGET_RATIO']),
+        ),
+    ))
+    return registry
+
+
+def _page_deadline() -> Deadline:
+    """Time budget of the current request, started on first use (normally at admission)"""
+    if 'deadline' not in g:
+        g.deadline = Deadline(current_app.config['PAGE_DEADLINE_SECONDS'])
+    return g.deadline
+
+
+def _temperature_trend(weather_data) -> dict:
+    """Build the result-page trend chart from locally stored history"""
+    try:
+        buckets = get_history_service().downsample(
+            weather_data.city, weather_data.country, 'temperature',
+            hours=current_app.config['HISTORY_TREND_HOURS'], bucket_seconds=3600
+        )
+        return build_trend_chart(buckets)
+    except Exception as e:
+        logger.error(f"Error building temperature trend for {weather_data.city}: {e}")
+        return None
 
 # ==================== Authentication Routes ====================
 
-@app.route('/')
 def home():
     """Redirect to login if not authenticated, else to weather page"""
     try:
@@ -35,7 +168,6 @@ def home():
         return redirect(url_for('login'))
 
 
-@app.route('/login', methods=['GET', 'POST'])
 def login():
     """Handle user login"""
     try:
@@ -50,7 +182,7 @@ def login():
             logger.debug(f"Login attempt for email: {email}")
             
             # Authenticate user using UserService
-            user = user_service.authenticate_user(email, password)
+            user = get_user_service().authenticate_user(email, password)
             
             if user:
                 session['user'] = user.email
@@ -68,7 +200,6 @@ def login():
         return render_template('login.html', error="An error occurred during login. Please try again.")
 
 
-@app.route('/signup', methods=['GET', 'POST'])
 def signup():
     """Handle user registration"""
     try:
@@ -92,7 +223,7 @@ def signup():
                 return render_template('signup.html', error="Password must be at least 6 characters!")
             
             # Register user using UserService
-            if user_service.register_user(email, username, password):
+            if get_user_service().register_user(email, username, password):
                 logger.info(f"New user registered successfully: {email}")
                 success = "Account created successfully! Please login."
                 return render_template('signup.html', success=success)
@@ -108,7 +239,6 @@ def signup():
         return render_template('signup.html', error="An error occurred during signup. Please try again.")
 
 
-@app.route('/logout')
 def logout():
     """Handle user logout"""
     try:
@@ -120,9 +250,54 @@ def logout():
         logger.error(f"Error in logout route: {e}")
         return redirect(url_for('login'))
 
+def preferences():
+    """Save unit and locale preferences in the session - requires authentication"""
+    if 'user' not in session:
+        logger.warning("Unauthenticated user attempting to change preferences")
+        return redirect(url_for('login'))
+    
+    prefs = normalize_preferences({key: request.form.get(key) for key in PREFERENCE_OPTIONS})
+    session['unit_prefs'] = prefs
+    logger.info(f"User {session.get('user')} updated unit preferences: {prefs}")
+    
+    next_url = request.form.get('next', '')
+    if not next_url.startswith('/') or next_url.startswith('//'):
+        next_url = url_for('weather')
+    return redirect(next_url)
+
+
+def _inject_units() -> dict:
+    """Context processor - expose the session's UnitFormatter to templates as `units`"""
+    return {
+        'units': get_formatter(session.get('unit_prefs')),
+        'unit_options': PREFERENCE_OPTIONS,
+    }
+
 # ==================== Weather Routes ====================
 
-@app.route('/weather', methods=['GET', 'POST'])
+def _render_result(weather_data):
+    """
+    Render the result page for fetched current weather
+    
+    With PROGRESSIVE_RENDERING the page is streamed: current conditions are
+    sent as soon as they render, the history trend is computed while the
+    rest of the page streams, and the forecast strip is fetched by the
+    browser from forecast_fragment.
+    """
+    if not current_app.config['PROGRESSIVE_RENDERING']:
+        return render_template('result.html', 
+                             weather=weather_data.to_dict(),
+                             trend=_temperature_trend(weather_data),
+                             trend_hours=current_app.config['HISTORY_TREND_HOURS'],
+                             username=session.get('username'))
+    return Response(stream_template('result.html',
+                                    weather=weather_data.to_dict(),
+                                    trend=lambda: _temperature_trend(weather_data),
+                                    trend_hours=current_app.config['HISTORY_TREND_HOURS'],
+                                    username=session.get('username')),
+                    mimetype='text/html')
+
+
 def weather():
     """Weather search page - requires authentication"""
     if 'user' not in session:
@@ -141,7 +316,7 @@ def weather():
             logger.info(f"User {session.get('user')} searching weather for: {city}")
             
             # Fetch current weather using WeatherService
-            weather_data = weather_service.get_current_weather(city)
+            weather_data = get_weather_service().get_current_weather(city, deadline=_page_deadline())
             
             if not weather_data:
                 logger.warning(f"City not found or API error: {city}")
@@ -149,16 +324,9 @@ def weather():
                 return render_template('index.html', error=error, 
                                      username=session.get('username'))
             
-            # Fetch forecast
-            forecast_list = weather_service.get_forecast(city)
-            
             logger.info(f"Successfully fetched weather for {weather_data.city}, {weather_data.country}")
             
-            # Render result even if forecast fails
-            return render_template('result.html', 
-                                 weather=weather_data.to_dict(),
-                                 forecast=[f.to_dict() for f in forecast_list] if forecast_list else [],
-                                 username=session.get('username'))
+            return _render_result(weather_data)
         
         return render_template('index.html', username=session.get('username'))
     
@@ -169,7 +337,102 @@ def weather():
                              username=session.get('username'))
 
 
-@app.route('/forecast', methods=['GET'])
+def _parse_coordinates():
+    """
+    Read lat/lon query parameters
+    
+    Returns:
+        (latitude, longitude) or None if missing or out of range
+    """
+    try:
+        latitude = float(request.args.get('lat', ''))
+        longitude = float(request.args.get('lon', ''))
+    except ValueError:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def _snap_to_city():
+    """Snap the request's lat/lon to the nearest known city within NEARBY_SNAP_KM"""
+    coordinates = _parse_coordinates()
+    if coordinates is None:
+        return None
+    found = get_city_index().nearest(*coordinates, max_km=current_app.config['NEARBY_SNAP_KM'])
+    return found[0] if found else None
+
+
+def weather_nearby():
+    """Current weather for the known city nearest to browser geolocation - requires authentication"""
+    if 'user' not in session:
+        logger.warning("Unauthenticated user attempting to access nearby weather")
+        return redirect(url_for('login'))
+    
+    try:
+        if _parse_coordinates() is None:
+            return render_template('index.html', error="Location not available!",
+                                 username=session.get('username'))
+        
+        city = _snap_to_city()
+        if city is None:
+            logger.info(f"No known city within {current_app.config['NEARBY_SNAP_KM']} km for {session.get('user')}")
+            error = "No known city near your location. Please search by name."
+            return render_template('index.html', error=error, 
+                                 username=session.get('username'))
+        
+        logger.info(f"User {session.get('user')} location snapped to {city.name}, {city.country}")
+        
+        # Canonical city query, so every nearby user shares the same cached payload
+        weather_data = get_weather_service().get_current_weather(city.query, deadline=_page_deadline())
+        
+        if not weather_data:
+            logger.warning(f"Weather unavailable for snapped city: {city.query}")
+            error = f"Weather for {city.name} is currently unavailable. Please try again."
+            return render_template('index.html', error=error, 
+                                 username=session.get('username'))
+        
+        return _render_result(weather_data)
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in nearby weather route: {e}", exc_info=True)
+        return render_template('index.html', 
+                             error="An error occurred while finding your location.",
+                             username=session.get('username'))
+
+
+def nearby_cities():
+    """Surrounding known cities with any cached weather, as JSON - requires authentication"""
+    if 'user' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    coordinates = _parse_coordinates()
+    if coordinates is None:
+        return jsonify({'error': 'Valid lat and lon are required'}), 400
+    
+    try:
+        config = current_app.config
+        k = min(request.args.get('k', config['NEARBY_MAX_RESULTS'], type=int), config['NEARBY_MAX_RESULTS'])
+        units = get_formatter(session.get('unit_prefs'))
+        weather_service = get_weather_service()
+        
+        cities = []
+        for city, distance_km in get_city_index().k_nearest(*coordinates, k, max_km=config['NEARBY_RADIUS_KM']):
+            entry = city.to_dict()
+            entry['distance_km'] = distance_km
+            # Cached weather only - the panel must never fan out upstream calls
+            cached = weather_service.get_cached_weather(city.query)
+            if cached:
+                entry['temperature'] = f"{units.temperature(cached.temperature)}{units.temperature_label}"
+                entry['description'] = cached.description
+            cities.append(entry)
+        
+        return jsonify({'cities': cities})
+    except Exception as e:
+        logger.error(f"Unexpected error in nearby cities route: {e}")
+        return jsonify({'error': 'Could not look up nearby cities'}), 500
+
+
 def forecast():
     """Display 5-day forecast page - requires authentication"""
     if 'user' not in session:
@@ -186,8 +449,11 @@ def forecast():
         
         logger.info(f"User {session.get('user')} requesting forecast for: {city}")
         
-        # Fetch forecast using WeatherService
-        forecast_list = weather_service.get_forecast(city)
+        # Fetch forecast using WeatherService; the response's city block
+        # supplies the map coordinates, so no second upstream call is needed
+        forecast_list, location = get_weather_service().get_forecast_with_location(
+            city, deadline=_page_deadline()
+        )
         
         if not forecast_list:
             logger.warning(f"City not found in forecast: {city}")
@@ -195,17 +461,14 @@ def forecast():
             return render_template('index.html', error=error, 
                                  username=session.get('username'))
         
-        # Also fetch current weather to get coordinates
-        weather_data = weather_service.get_current_weather(city)
-        
-        if weather_data:
-            logger.info(f"Successfully fetched forecast for {weather_data.city}, {weather_data.country}")
+        if location:
+            logger.info(f"Successfully fetched forecast for {location.name}, {location.country}")
             return render_template('forecast.html',
                                  forecast=[f.to_dict() for f in forecast_list],
-                                 city=weather_data.city,
-                                 country=weather_data.country,
-                                 latitude=weather_data.latitude,
-                                 longitude=weather_data.longitude,
+                                 city=location.name,
+                                 country=location.country,
+                                 latitude=location.latitude,
+                                 longitude=location.longitude,
                                  username=session.get('username'))
         else:
             return render_template('forecast.html',
@@ -222,9 +485,311 @@ def forecast():
         return render_template('index.html', error=error, 
                              username=session.get('username'))
 
+
+def forecast_fragment():
+    """
+    5-day summary strip as an HTML fragment for the result page - requires authentication
+    
+    Successful fragments are browser-cacheable (private, keyed on the session
+    cookie since units are rendered in) and carry an ETag, so revisits
+    within FORECAST_FRAGMENT_MAX_AGE cost neither an upstream call nor a render.
+    """
+    if 'user' not in session:
+        return 'Authentication required', 401
+    
+    city = request.args.get('city', '').strip()
+    if not city:
+        return 'City not specified', 400
+    
+    try:
+        forecast_list = get_weather_service().get_forecast(city, deadline=_page_deadline())
+        response = current_app.make_response(render_template(
+            'forecast_fragment.html',
+            forecast=[f.to_dict() for f in forecast_list] if forecast_list else None,
+            city=city
+        ))
+        if not forecast_list:
+            logger.warning(f"Forecast fragment unavailable for city: {city}")
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        
+        response.headers['Cache-Control'] = f"private, max-age={current_app.config['FORECAST_FRAGMENT_MAX_AGE']}"
+        response.vary.add('Cookie')
+        response.add_etag()
+        return response.make_conditional(request)
+    except Exception as e:
+        logger.error(f"Unexpected error in forecast fragment route: {e}")
+        return 'Forecast unavailable', 500
+
+def history():
+    """Return stored observations for a city as JSON - requires authentication"""
+    if 'user' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    city = request.args.get('city', '').strip()
+    country = request.args.get('country', '').strip()
+    metric = request.args.get('metric', 'temperature')
+    
+    if not city:
+        return jsonify({'error': 'City not specified'}), 400
+    if metric not in METRICS:
+        return jsonify({'error': f"Unknown metric: {metric}"}), 400
+    
+    try:
+        hours = float(request.args.get('hours', 24))
+        bucket = request.args.get('bucket', type=float)
+        history_service = get_history_service()
+        
+        if bucket:
+            points = history_service.downsample(city, country, metric, hours=hours, bucket_seconds=bucket)
+        else:
+            points = [{'ts': ts, 'value': value}
+                      for ts, value in history_service.range(city, country, metric, hours=hours)]
+        
+        return jsonify({
+            'city': city,
+            'country': country,
+            'metric': metric,
+            'points': points,
+            'latest': history_service.latest(city, country),
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Unexpected error in history route: {e}")
+        return jsonify({'error': 'Could not read history'}), 500
+
+# ==================== Alert Routes ====================
+
+def alerts():
+    """List and create forecast alert rules - requires authentication"""
+    if 'user' not in session:
+        logger.warning("Unauthenticated user attempting to access alerts page")
+        return redirect(url_for('login'))
+    
+    user = session.get('user')
+    error = None
+    success = None
+    
+    try:
+        alert_store = get_alert_store()
+        
+        if request.method == 'POST':
+            city = request.form.get('city', '').strip()
+            field = request.form.get('field', '')
+            operator = request.form.get('operator', '')
+            threshold = request.form.get('threshold', '').strip()
+            day = request.form.get('day', 'any')
+            
+            if not city or not threshold:
+                error = "City and threshold are required!"
+            elif field not in AlertRule.FIELD_KINDS or operator not in AlertRule.OPERATORS:
+                error = "Invalid alert condition!"
+            elif day != 'any' and day not in [str(offset) for offset in range(AlertRule.FORECAST_DAYS)]:
+                error = "Invalid forecast day!"
+            else:
+                try:
+                    number = float(threshold)
+                    if not math.isfinite(number):
+                        raise ValueError(f"Non-finite threshold: {threshold}")
+                    value = get_formatter(session.get('unit_prefs')).to_metric(AlertRule.FIELD_KINDS[field], number)
+                    day_offset = None if day == 'any' else int(day)
+                    alert_store.add_rule(user, city, field, operator, value, day_offset)
+                    success = "Alert created!"
+                except ValueError:
+                    error = "Threshold must be a number!"
+            
+            if error:
+                logger.warning(f"Invalid alert rule from {user}: {error}")
+        
+        return render_template('alerts.html',
+                             rules=alert_store.rules_for_user(user),
+                             field_kinds=AlertRule.FIELD_KINDS,
+                             operators=AlertRule.OPERATORS,
+                             error=error,
+                             success=success,
+                             username=session.get('username'))
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in alerts route: {e}")
+        return render_template('index.html', error="An error occurred while loading alerts.",
+                             username=session.get('username'))
+
+
+def delete_alert(rule_id):
+    """Delete one of the user's alert rules - requires authentication"""
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    
+    try:
+        if not get_alert_store().delete_rule(rule_id, session.get('user')):
+            logger.warning(f"User {session.get('user')} tried to delete unknown alert {rule_id}")
+    except Exception as e:
+        logger.error(f"Error deleting alert {rule_id}: {e}")
+    return redirect(url_for('alerts'))
+
+# ==================== Admin Routes ====================
+
+def _is_admin() -> bool:
+    """Check whether the logged-in user is listed in ADMIN_EMAILS"""
+    return session.get('user') in current_app.config['ADMIN_EMAILS']
+
+
+def _admin_forbidden():
+    """JSON response for non-admin access to admin routes"""
+    logger.warning(f"Non-admin user {session.get('user')} attempted to access {request.path}")
+    return jsonify({'error': 'Admin access required'}), 403
+
+
+def _start_request_profile():
+    """before_request hook - start cProfile for sampled or explicitly requested requests"""
+    profiler = current_app.extensions['weather_profiler']
+    requested = request.headers.get(current_app.config['PROFILE_HEADER']) and _is_admin()
+    if requested or profiler.should_sample():
+        profile = profiler.start()
+        if profile is not None:
+            g.request_profile = (profile, time.perf_counter())
+
+
+def _finish_request_profile(error=None):
+    """teardown_request hook - store the profile started for this request"""
+    started = g.pop('request_profile', None)
+    if started:
+        profile, started_at = started
+        current_app.extensions['weather_profiler'].finish(
+            profile, f"{request.method} {request.path}", (time.perf_counter() - started_at) * 1000
+        )
+
+
+def profiler_status():
+    """List captured request profiles and the stack sampler state - admin only"""
+    if not _is_admin():
+        return _admin_forbidden()
+    return jsonify({
+        'pid': os.getpid(),
+        'sample_rate': current_app.extensions['weather_profiler'].sample_rate,
+        'profiles': current_app.extensions['weather_profiler'].list_profiles(),
+        'sampler': current_app.extensions['weather_sampler'].status(),
+    })
+
+
+def profiler_request_report(profile_id):
+    """Return one captured request profile as text, or as .pstats with ?format=pstats - admin only"""
+    if not _is_admin():
+        return _admin_forbidden()
+    profiler = current_app.extensions['weather_profiler']
+    
+    if request.args.get('format') == 'pstats':
+        data = profiler.dump(profile_id)
+        if data is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        return Response(data, mimetype='application/octet-stream', headers={
+            'Content-Disposition': f'attachment; filename=request-{profile_id}.pstats'
+        })
+    
+    report = profiler.report(profile_id, sort=request.args.get('sort', 'cumulative'))
+    if report is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return Response(report, mimetype='text/plain')
+
+
+def profiler_sampler_start():
+    """Switch the wall-clock stack sampler on for N seconds - admin only"""
+    if not _is_admin():
+        return _admin_forbidden()
+    
+    try:
+        seconds = min(float(request.args.get('seconds', 30)),
+                      current_app.config['PROFILE_MAX_SAMPLER_SECONDS'])
+        interval_ms = max(float(request.args.get('interval_ms', 5)), 1.0)
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    
+    sampler = current_app.extensions['weather_sampler']
+    if not sampler.start(seconds, interval_ms / 1000):
+        return jsonify({'error': 'Sampler already running', 'sampler': sampler.status()}), 409
+    logger.info(f"Admin {session.get('user')} started stack sampler for {seconds}s")
+    return jsonify({'sampler': sampler.status()}), 202
+
+
+def profiler_sampler_stop():
+    """Stop a running stack sampler capture - admin only"""
+    if not _is_admin():
+        return _admin_forbidden()
+    sampler = current_app.extensions['weather_sampler']
+    sampler.stop()
+    return jsonify({'sampler': sampler.status()})
+
+
+def profiler_collapsed_stacks():
+    """Download the last sampler capture as flame-graph collapsed stacks - admin only"""
+    if not _is_admin():
+        return _admin_forbidden()
+    return Response(current_app.extensions['weather_sampler'].collapsed(), mimetype='text/plain', headers={
+        'Content-Disposition': 'attachment; filename=stacks.collapsed.txt'
+    })
+
+def admission_status():
+    """Expose admission pool depth and shed counters - admin only"""
+    if not _is_admin():
+        return _admin_forbidden()
+    return jsonify(current_app.extensions['weather_admission'].stats())
+
+# ==================== Admission Control ====================
+
+def _admit_request():
+    """
+    before_request hook - gate upstream-bound requests through their pool
+    
+    Requests that cannot reach upstream (no city, or a cached payload) and
+    every other route bypass admission entirely.
+    """
+    route = current_app.config['ADMISSION_ROUTES'].get(request.endpoint)
+    if not route:
+        return None
+    route_class, cache_endpoint = route
+    
+    if 'user' not in session:
+        return None
+    city = request.values.get('city', '').strip()
+    if not city and request.endpoint == 'weather_nearby':
+        snapped = _snap_to_city()
+        city = snapped.query if snapped else ''
+    if not city:
+        return None
+    if get_weather_service().is_cached(city, cache_endpoint):
+        return None
+    
+    pool = current_app.extensions['weather_admission'].pool(route_class)
+    if pool is None:
+        return None
+    # Time spent queueing comes out of the page's own deadline
+    queue_deadline = min(time.monotonic() + pool.queue_timeout, _page_deadline().expires_at)
+    if not pool.acquire(queue_deadline):
+        retry_after = pool.retry_after()
+        logger.warning(f"Shedding {request.method} {request.path} ({route_class} pool saturated, "
+                       f"retry after {retry_after}s)")
+        response = current_app.make_response((
+            render_template('error.html',
+                            error_code=503,
+                            error_message="The service is busy - please try again shortly"),
+            503
+        ))
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+    g.admission = (pool, time.monotonic())
+    return None
+
+
+def _release_admission(error=None):
+    """teardown_request hook - return the pool slot taken by _admit_request"""
+    admitted = g.pop('admission', None)
+    if admitted:
+        pool, started_at = admitted
+        pool.release(time.monotonic() - started_at)
+
 # ==================== Error Handlers ====================
 
-@app.errorhandler(400)
 def bad_request(error):
     """Handle 400 Bad Request errors"""
     logger.error(f"400 Bad Request: {error}")
@@ -233,7 +798,6 @@ def bad_request(error):
                          error_message="Bad Request - Invalid input provided"), 400
 
 
-@app.errorhandler(404)
 def not_found(error):
     """Handle 404 Not Found errors"""
     logger.warning(f"404 Not Found: {request.url}")
@@ -242,7 +806,6 @@ def not_found(error):
                          error_message="Page Not Found"), 404
 
 
-@app.errorhandler(500)
 def internal_error(error):
     """Handle 500 Internal Server errors"""
     logger.critical(f"500 Internal Server Error: {error}")
@@ -251,7 +814,6 @@ def internal_error(error):
                          error_message="Internal Server Error - Please try again later"), 500
 
 
-@app.errorhandler(Exception)
 def handle_exception(error):
     """Handle all unhandled exceptions"""
     logger.critical(f"Unhandled exception: {error}", exc_info=True)
@@ -260,6 +822,138 @@ def handle_exception(error):
                          error_message="An unexpected error occurred"), 500
 
 
+# ==================== Application Factory ====================
+
+def _register_routes(app: Flask) -> None:
+    """Attach view functions and error handlers to the application"""
+    app.add_url_rule('/', view_func=home)
+    app.add_url_rule('/login', view_func=login, methods=['GET', 'POST'])
+    app.add_url_rule('/signup', view_func=signup, methods=['GET', 'POST'])
+    app.add_url_rule('/logout', view_func=logout)
+    app.add_url_rule('/preferences', view_func=preferences, methods=['POST'])
+    app.add_url_rule('/weather', view_func=weather, methods=['GET', 'POST'])
+    app.add_url_rule('/weather/nearby', view_func=weather_nearby, methods=['GET'])
+    app.add_url_rule('/forecast', view_func=forecast, methods=['GET'])
+    app.add_url_rule('/forecast/fragment', view_func=forecast_fragment, methods=['GET'])
+    app.add_url_rule('/nearby.json', view_func=nearby_cities, methods=['GET'])
+    app.add_url_rule('/history', view_func=history, methods=['GET'])
+    app.add_url_rule('/alerts', view_func=alerts, methods=['GET', 'POST'])
+    app.add_url_rule('/alerts/<rule_id>/delete', view_func=delete_alert, methods=['POST'])
+    
+    if app.config['PROFILER_ENABLED']:
+        _register_profiler(app)
+    
+    if app.config['ADMISSION_ENABLED']:
+        app.extensions['weather_admission'] = AdmissionController(app.config['ADMISSION_POOLS'])
+        app.before_request(_admit_request)
+        app.teardown_request(_release_admission)
+        app.add_url_rule('/admin/admission', view_func=admission_status)
+    
+    app.context_processor(_inject_units)
+    
+    app.register_error_handler(400, bad_request)
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(500, internal_error)
+    app.register_error_handler(Exception, handle_exception)
+
+
+def _register_profiler(app: Flask) -> None:
+    """
+    Install profiling hooks and admin routes
+    
+    Only called when PROFILER_ENABLED is set, so a disabled profiler adds
+    no hooks or routes at all.
+    """
+    app.extensions['weather_profiler'] = RequestProfiler(app.config['PROFILE_SAMPLE_RATE'])
+    app.extensions['weather_sampler'] = StackSampler()
+    app.before_request(_start_request_profile)
+    app.teardown_request(_finish_request_profile)
+    
+    app.add_url_rule('/admin/profiler', view_func=profiler_status)
+    app.add_url_rule('/admin/profiler/requests/<int:profile_id>', view_func=profiler_request_report)
+    app.add_url_rule('/admin/profiler/sampler', view_func=profiler_sampler_start, methods=['POST'])
+    app.add_url_rule('/admin/profiler/sampler/stop', view_func=profiler_sampler_stop, methods=['POST'])
+    app.add_url_rule('/admin/profiler/sampler/stacks', view_func=profiler_collapsed_stacks)
+    logger.info(f"Profiler enabled (sample rate {app.config['PROFILE_SAMPLE_RATE']})")
+
+
+def _register_commands(app: Flask) -> None:
+    """Attach CLI commands (run with `flask --app app <command>`)"""
+    
+    @app.cli.command('alerts-run')
+    @click.option('--once', is_flag=True, help='Run a single evaluation cycle and exit')
+    @click.option('--interval', type=float, default=None, help='Seconds between cycles')
+    def alerts_run(once, interval):
+        """Evaluate all alert rules: one forecast fetch per distinct city per cycle"""
+        scheduler = AlertScheduler(
+            get_weather_service(),
+            get_alert_store(),
+            JsonLinesAlertSink(app.config['ALERTS_DELIVERY_FILE']),
+            interval=interval or app.config['ALERTS_INTERVAL'],
+        )
+        if once:
+            click.echo(scheduler.run_once())
+            scheduler.sink.flush()
+        else:
+            scheduler.run_forever()
+
+
+def create_app(config: Optional[Dict] = None, services: Optional[Dict] = None) -> Flask:
+    """
+    Build a configured Weather App instance
+    
+    Creating the app is cheap: logging handlers open their file on first
+    write and services are only constructed on first use.
+    
+    Args:
+        config: Values overriding DEFAULT_CONFIG
+        services: Ready-made service instances keyed by registry name
+                  ('user_service', 'weather_service'), e.g. for tests
+        
+    Returns:
+        Configured Flask application
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    if config:
+        app.config.update(config)
+    
+    configure_logging(app.config['LOG_DIR'])
+    
+    registry = _build_registry(app)
+    for name, instance in (services or {}).items():
+        registry.override(name, instance)
+    app.extensions['weather_services'] = registry
+    
+    _register_routes(app)
+    _register_commands(app)
+    return app
+
+
+def warm_up(app: Flask) -> None:
+    """
+    Load read-only state ahead of serving traffic
+    
+    Called by the production server in the master process before workers
+    are forked, so compiled templates and loaded data are shared between
+    workers copy-on-write instead of being rebuilt in every worker. Mutable
+    file-backed state (users, alert rules) is left to each worker to load.
+    
+    Args:
+        app: Application returned by create_app()
+    """
+    with app.app_context():
+        for template_name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(template_name)
+        registry = get_services()
+        registry.get('weather_service')
+        registry.get('city_index')
+    logger.info("Application warm-up complete")
+
+
+app = create_app()
+
+
 # ==================== App Startup ====================
 
 if __name__ == '__main__':
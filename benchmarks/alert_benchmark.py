@@ -0,0 +1,79 @@
+"""
+Alert Evaluation Benchmark for Weather App
+Measures rules evaluated per second by AlertEngine on synthetic data
+
+Usage:
+    python -m benchmarks.alert_benchmark [--rules N] [--cities N]
+"""
+
+import argparse
+import random
+import time
+
+from alerts import AlertEngine
+from models import AlertRule, ForecastDay
+
+
+def build_rules(count: int, cities: int, seed: int = 1) -> list:
+    """Random rules spread over `cities` synthetic cities"""
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        field = rng.choice(AlertRule.FIELDS)
+        threshold = rng.uniform(0, 100) if field in ('rain_chance', 'humidity') else rng.uniform(-10, 40)
+        rules.append(AlertRule(
+            rule_id=f"r{i}",
+            user_email=f"user{i % 50000}@example.com",
+            city=f"city{rng.randrange(cities)}",
+            field=field,
+            operator=rng.choice(AlertRule.OPERATORS),
+            threshold=threshold,
+            day_offset=rng.choice((None, 0, 1, 2)),
+        ))
+    return rules
+
+
+def build_forecast(seed: int) -> list:
+    """Five synthetic ForecastDay objects"""
+    rng = random.Random(seed)
+    return [
+        ForecastDay(f"2025-01-0{d + 1}", 'Day', {
+            'temp_max': rng.uniform(0, 35),
+            'temp_min': rng.uniform(-10, 20),
+            'humidity': rng.uniform(20, 100),
+            'wind_speed': rng.uniform(0, 20),
+            'wind_gust': rng.uniform(0, 30),
+            'rain_chance': rng.uniform(0, 100),
+        })
+        for d in range(5)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark alert rule evaluation')
+    parser.add_argument('--rules', type=int, default=200000, help='number of rules')
+    parser.add_argument('--cities', type=int, default=2000, help='number of distinct cities')
+    parser.add_argument('--cycles', type=int, default=3, help='evaluation cycles to time')
+    args = parser.parse_args()
+
+    rules = build_rules(args.rules, args.cities)
+    started = time.perf_counter()
+    engine = AlertEngine(rules)
+    index_seconds = time.perf_counter() - started
+    forecasts = {city: build_forecast(i) for i, city in enumerate(engine.cities())}
+
+    best = float('inf')
+    fired = 0
+    for _ in range(args.cycles):
+        started = time.perf_counter()
+        fired = sum(len(engine.evaluate(city, forecast)) for city, forecast in forecasts.items())
+        best = min(best, time.perf_counter() - started)
+
+    print(f"Alert evaluation benchmark ({args.rules} rules, {len(forecasts)} cities)")
+    print(f"index build        {index_seconds * 1000:10.1f} ms")
+    print(f"evaluation cycle   {best * 1000:10.1f} ms   ({fired} rules fired)")
+    print(f"throughput         {args.rules / best:10.0f} rules/s")
+
+
+if __name__ == '__main__':
+    main()
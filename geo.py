@@ -0,0 +1,244 @@
+"""
+Spatial City Index for Weather App
+Snaps raw coordinates to known cities so location lookups share cached weather
+
+Cities are stored as points on the unit sphere and indexed by a k-d tree
+on (x, y, z). Straight-line (chord) distance on the sphere is monotonic
+in great-circle distance, so nearest-neighbour results are exact without
+special handling of the antimeridian or the poles.
+"""
+
+import csv
+import heapq
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils.app_logger import logger
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+CITIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cities.csv')
+
+
+def _to_unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(math.pi / 2, km / (2 * EARTH_RADIUS_KM)))
+
+
+class KnownCity:
+    """A canonical city the index can snap coordinates to"""
+
+    __slots__ = ('name', 'country', 'latitude', 'longitude', 'vector')
+
+    def __init__(self, name: str, country: str, latitude: float, longitude: float):
+        """
+        Initialize KnownCity
+
+        Args:
+            name: City name
+            country: Country code
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
+        """
+        self.name = name
+        self.country = country
+        self.latitude = round(float(latitude), 4)
+        self.longitude = round(float(longitude), 4)
+        self.vector = _to_unit_vector(self.latitude, self.longitude)
+
+    @property
+    def query(self) -> str:
+        """Upstream search text addressing exactly this city"""
+        return f"{self.name},{self.country}" if self.country else self.name
+
+    def to_dict(self) -> Dict:
+        """Convert city to dictionary"""
+        return {
+            'name': self.name,
+            'country': self.country,
+            'latitude': self.latitude,
+            'longitude': self.longitude
+        }
+
+    def __repr__(self) -> str:
+        return f"KnownCity({self.name}, {self.country})"
+
+
+class _Node:
+    __slots__ = ('city', 'axis', 'left', 'right')
+
+    def __init__(self, city: KnownCity, axis: int, left: Optional['_Node'], right: Optional['_Node']):
+        self.city = city
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+def _build(cities: List[KnownCity], depth: int = 0) -> Optional[_Node]:
+    if not cities:
+        return None
+    axis = depth % 3
+    cities.sort(key=lambda c: c.vector[axis])
+    middle = len(cities) // 2
+    return _Node(cities[middle], axis,
+                 _build(cities[:middle], depth + 1),
+                 _build(cities[middle + 1:], depth + 1))
+
+
+class CityIndex:
+    """
+    k-d tree over known cities with nearest and k-nearest queries
+
+    Cities learned at runtime (e.g. from fetched WeatherData) are kept in a
+    small pending list that is scanned linearly and folded into the tree
+    once it grows past rebuild_threshold.
+    """
+
+    def __init__(self, cities: Optional[List[KnownCity]] = None, rebuild_threshold: int = 64):
+        """
+        Initialize CityIndex
+
+        Args:
+            cities: Initial cities
+            rebuild_threshold: Pending additions that trigger a tree rebuild
+        """
+        self.rebuild_threshold = rebuild_threshold
+        self._lock = threading.Lock()
+        self._cities: Dict[Tuple[str, str], KnownCity] = {}
+        for city in cities or []:
+            self._cities.setdefault(self._key(city.name, city.country), city)
+        self._pending: List[KnownCity] = []
+        self._root = _build(list(self._cities.values()))
+
+    @staticmethod
+    def _key(name: str, country: str) -> Tuple[str, str]:
+        return (' '.join(name.lower().split()), (country or '').upper())
+
+    @classmethod
+    def from_csv(cls, path: str = CITIES_FILE) -> 'CityIndex':
+        """
+        Build an index from a CSV with name,country,latitude,longitude columns
+
+        Args:
+            path: CSV file path (defaults to the bundled city list)
+
+        Returns:
+            CityIndex (empty if the file cannot be read)
+        """
+        cities = []
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    try:
+                        cities.append(KnownCity(row['name'], row['country'],
+                                                float(row['latitude']), float(row['longitude'])))
+                    except (KeyError, ValueError) as e:
+                        logger.warning(f"Skipping invalid city row {row}: {e}")
+            logger.info(f"Loaded {len(cities)} cities from {path}")
+        except IOError as e:
+            logger.error(f"IO Error reading city list {path}: {e}")
+        return cls(cities)
+
+    def __len__(self) -> int:
+        return len(self._cities)
+
+    def add(self, name: str, country: str, latitude: float, longitude: float) -> bool:
+        """
+        Learn a city (no-op if already known)
+
+        Returns:
+            True if the city was new
+        """
+        key = self._key(name, country)
+        if key in self._cities or not name:
+            return False
+        city = KnownCity(name, country, latitude, longitude)
+        with self._lock:
+            if key in self._cities:
+                return False
+            self._cities[key] = city
+            self._pending.append(city)
+            if len(self._pending) >= self.rebuild_threshold:
+                self._root = _build(list(self._cities.values()))
+                self._pending = []
+        return True
+
+    def _search(self, target: Tuple[float, float, float], k: int, max_chord: float) -> List[Tuple[float, KnownCity]]:
+        # Max-heap of the k best (as negated distances), seeded with pending cities
+        best: List[Tuple[float, int, KnownCity]] = []
+
+        def consider(city: KnownCity) -> None:
+            distance = math.dist(target, city.vector)
+            if distance > max_chord:
+                return
+            item = (-distance, id(city), city)
+            if len(best) < k:
+                heapq.heappush(best, item)
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, item)
+
+        for city in list(self._pending):
+            consider(city)
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            consider(node.city)
+            diff = target[node.axis] - node.city.vector[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            bound = max_chord if len(best) < k else min(max_chord, -best[0][0])
+            if abs(diff) <= bound:
+                stack.append(far)
+            stack.append(near)
+
+        return sorted(((-d, city) for d, _, city in best), key=lambda pair: pair[0])
+
+    def nearest(self, latitude: float, longitude: float,
+                max_km: Optional[float] = None) -> Optional[Tuple[KnownCity, float]]:
+        """
+        Snap a coordinate to the closest known city
+
+        Args:
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
+            max_km: Tolerance; None accepts any distance
+
+        Returns:
+            (city, distance_km) or None if nothing lies within max_km
+        """
+        found = self.k_nearest(latitude, longitude, 1, max_km)
+        return found[0] if found else None
+
+    def k_nearest(self, latitude: float, longitude: float, k: int,
+                  max_km: Optional[float] = None) -> List[Tuple[KnownCity, float]]:
+        """
+        The k closest known cities, nearest first
+
+        Args:
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
+            k: Number of cities
+            max_km: Optional search radius
+
+        Returns:
+            List of (city, distance_km)
+        """
+        if k <= 0:
+            return []
+        max_chord = _km_to_chord(max_km) if max_km is not None else 2.0
+        results = self._search(_to_unit_vector(latitude, longitude), k, max_chord)
+        return [(city, round(_chord_to_km(chord), 1)) for chord, city in results]
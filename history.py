@@ -0,0 +1,552 @@
+"""
+Observation History for Weather App
+Append-only, columnar time-series store of every fetched WeatherData
+
+Layout on disk (one directory per city, one sub-directory per segment):
+
+    <root>/<city_key>/<first_ts>-<pid>-<seq>/ts.f64
+    <root>/<city_key>/<first_ts>-<pid>-<seq>/temperature.f64
+    ...
+
+Every column file is a flat array of little-endian doubles, appended
+row-by-row by exactly one writer process (the pid in the segment name),
+so concurrent workers never interleave writes. Sealed segments are
+read through mmap; compaction merges them into one sorted segment and
+drops rows older than the retention window.
+"""
+
+import array
+import atexit
+import bisect
+import fcntl
+import mmap
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import WeatherData
+from utils.app_logger import logger
+from utils.ttl_cache import TTLCache
+
+
+METRICS = (
+    'temperature', 'feels_like', 'temp_min', 'temp_max', 'humidity', 'pressure',
+    'visibility', 'wind_speed', 'wind_gust', 'cloudiness', 'rain', 'snow',
+)
+
+_TS_COLUMN = 'ts'
+_COLUMN_SUFFIX = '.f64'
+_SEALED_MARKER = 'sealed'
+_LOCK_FILE = '.lock'
+_ITEM_SIZE = 8
+
+
+def city_key(city: str, country: str = '') -> str:
+    """
+    Build the directory-safe key used to store a city's history
+
+    Args:
+        city: City name as returned by the API
+        country: Country code as returned by the API
+
+    Returns:
+        Lower-case key such as 'london-gb'
+    """
+    def slug(text: str) -> str:
+        return re.sub(r'[^a-z0-9]+', '_', (text or '').strip().lower()).strip('_')
+
+    return f"{slug(city)}-{slug(country)}" if country else slug(city)
+
+
+def _to_array(values: Iterable[float]) -> array.array:
+    column = array.array('d', values)
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+
+class _SegmentReader:
+    """Read-only, memory-mapped view of one segment's columns"""
+
+    def __init__(self, path: str, metrics: Iterable[str]):
+        self.path = path
+        self._maps = []
+        self.columns: Dict[str, memoryview] = {}
+        for name in (_TS_COLUMN, *metrics):
+            self.columns[name] = self._map_column(name)
+        self.rows = min(len(column) for column in self.columns.values())
+
+    def _map_column(self, name: str) -> memoryview:
+        file_path = os.path.join(self.path, name + _COLUMN_SUFFIX)
+        try:
+            with open(file_path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                usable = size - size % _ITEM_SIZE
+                if usable == 0:
+                    return memoryview(b'').cast('d')
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return memoryview(b'').cast('d')
+        self._maps.append(mapped)
+        return memoryview(mapped)[:usable].cast('d')
+
+    def close(self) -> None:
+        for column in self.columns.values():
+            column.release()
+        self.columns = {}
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+    def __enter__(self) -> '_SegmentReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ObservationStore:
+    """Columnar, append-only observation store backed by segment files"""
+
+    def __init__(self, root_dir: str, segment_rows: int = 4096,
+                 retention_seconds: float = 30 * 24 * 3600):
+        """
+        Initialize ObservationStore
+
+        Args:
+            root_dir: Directory holding one sub-directory per city
+            segment_rows: Rows after which a writer seals its segment
+            retention_seconds: Age after which compaction drops rows
+        """
+        self.root_dir = root_dir
+        self.segment_rows = segment_rows
+        self.retention_seconds = retention_seconds
+        self._active: Dict[str, Tuple[str, int, float]] = {}
+        self._active_pid = os.getpid()
+        self._seq = 0
+
+    # ---------- writing ----------
+
+    def _city_dir(self, key: str) -> str:
+        return os.path.join(self.root_dir, key)
+
+    def _list_segments(self, key: str) -> List[str]:
+        city_dir = self._city_dir(key)
+        try:
+            names = sorted(n for n in os.listdir(city_dir) if not n.startswith('.'))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(city_dir, n) for n in names]
+
+    def _new_segment(self, key: str, first_ts: float) -> str:
+        self._seq += 1
+        path = os.path.join(self._city_dir(key), f"{int(first_ts):012d}-{os.getpid()}-{self._seq}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def append_rows(self, key: str, timestamps: List[float], rows: List[Dict[str, float]]) -> None:
+        """
+        Append observations for one city (called from the writer thread)
+
+        Metric columns are written before the timestamp column so readers,
+        which use the shortest column as the row count, never see a
+        timestamp without its values.
+
+        Args:
+            key: City key (see city_key)
+            timestamps: Observation times (epoch seconds), ascending
+            rows: One {metric: value} dict per timestamp
+        """
+        if not timestamps:
+            return
+        if os.getpid() != self._active_pid:
+            # Forked child: never continue the parent's segments
+            self._active = {}
+            self._active_pid = os.getpid()
+
+        start = 0
+        while start < len(timestamps):
+            path, count, last_ts = self._active.get(key, (None, 0, 0.0))
+            if path is None or count >= self.segment_rows or timestamps[start] < last_ts:
+                # Segments must stay time-ordered for bisect; out-of-order rows start a new one
+                if path is not None:
+                    self._seal(path)
+                path, count = self._new_segment(key, timestamps[start]), 0
+            take = min(self.segment_rows - count, len(timestamps) - start)
+            batch_ts = timestamps[start:start + take]
+            batch_rows = rows[start:start + take]
+            for metric in METRICS:
+                column = _to_array(float(r.get(metric) or 0.0) for r in batch_rows)
+                with open(os.path.join(path, metric + _COLUMN_SUFFIX), 'ab') as f:
+                    f.write(column.tobytes())
+            with open(os.path.join(path, _TS_COLUMN + _COLUMN_SUFFIX), 'ab') as f:
+                f.write(_to_array(batch_ts).tobytes())
+            self._active[key] = (path, count + take, batch_ts[-1])
+            start += take
+
+    def _seal(self, path: str) -> None:
+        open(os.path.join(path, _SEALED_MARKER), 'w').close()
+
+    def seal_all(self) -> None:
+        """Seal every segment this process is writing (e.g. on shutdown)"""
+        if os.getpid() != self._active_pid:
+            return
+        for path, _count, _last_ts in self._active.values():
+            if os.path.isdir(path):
+                self._seal(path)
+        self._active = {}
+
+    # ---------- reading ----------
+
+    def _read_segments(self, key: str, metrics: Iterable[str]):
+        metrics = tuple(metrics)
+        for path in self._list_segments(key):
+            try:
+                reader = _SegmentReader(path, metrics)
+            except (FileNotFoundError, NotADirectoryError):
+                # Removed by a concurrent compaction; its rows now live in the merged segment
+                continue
+            yield reader
+
+    def range(self, key: str, metric: str, start: float, end: float) -> List[Tuple[float, float]]:
+        """
+        Return (timestamp, value) pairs with start <= timestamp < end
+
+        Args:
+            key: City key
+            metric: One of METRICS
+            start: Range start (epoch seconds)
+            end: Range end (epoch seconds)
+
+        Returns:
+            Points sorted by timestamp
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        points: List[Tuple[float, float]] = []
+        for reader in self._read_segments(key, (metric,)):
+            with reader:
+                ts = reader.columns[_TS_COLUMN][:reader.rows]
+                values = reader.columns[metric][:reader.rows]
+                lo = bisect.bisect_left(ts, start)
+                hi = bisect.bisect_left(ts, end, lo)
+                points.extend(zip(ts[lo:hi].tolist(), values[lo:hi].tolist()))
+                ts.release()
+                values.release()
+        points.sort()
+        return points
+
+    def downsample(self, key: str, metric: str, start: float, end: float,
+                   bucket_seconds: float) -> List[Dict[str, float]]:
+        """
+        Aggregate a range into fixed-width buckets
+
+        Returns:
+            One dict per non-empty bucket with ts (bucket start), min, max,
+            mean and count
+        """
+        buckets: Dict[int, List[float]] = {}
+        for ts, value in self.range(key, metric, start, end):
+            index = int((ts - start) // bucket_seconds)
+            bucket = buckets.get(index)
+            if bucket is None:
+                buckets[index] = [value, value, value, 1]
+            else:
+                if value < bucket[0]:
+                    bucket[0] = value
+                if value > bucket[1]:
+                    bucket[1] = value
+                bucket[2] += value
+                bucket[3] += 1
+        return [
+            {
+                'ts': start + index * bucket_seconds,
+                'min': b[0],
+                'max': b[1],
+                'mean': b[2] / b[3],
+                'count': b[3],
+            }
+            for index, b in sorted(buckets.items())
+        ]
+
+    def latest(self, key: str, metrics: Iterable[str] = METRICS) -> Optional[Dict[str, float]]:
+        """
+        Return the most recent observation for a city
+
+        Returns:
+            Dict with 'ts' and the requested metrics, or None if no history
+        """
+        metrics = tuple(metrics)
+        best: Optional[Dict[str, float]] = None
+        for reader in self._read_segments(key, metrics):
+            with reader:
+                if not reader.rows:
+                    continue
+                last = reader.rows - 1
+                ts = reader.columns[_TS_COLUMN][last]
+                if best is None or ts > best['ts']:
+                    best = {'ts': ts}
+                    for metric in metrics:
+                        best[metric] = reader.columns[metric][last]
+        return best
+
+    # ---------- compaction ----------
+
+    def _is_compactable(self, path: str, min_idle_seconds: float) -> bool:
+        if os.path.exists(os.path.join(path, _SEALED_MARKER)):
+            return True
+        try:
+            pid = int(os.path.basename(path).split('-')[1])
+            idle = time.time() - os.path.getmtime(os.path.join(path, _TS_COLUMN + _COLUMN_SUFFIX))
+        except (IndexError, ValueError, OSError):
+            return False
+        if pid == os.getpid() or idle < min_idle_seconds:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True  # writer exited without sealing (e.g. recycled worker)
+        except PermissionError:
+            return False
+        return False
+
+    def compact(self, key: str, min_segments: int = 2, min_idle_seconds: float = 300) -> bool:
+        """
+        Merge a city's finished segments into one and apply retention
+
+        Args:
+            key: City key
+            min_segments: Skip compaction below this many finished segments
+            min_idle_seconds: How long an unsealed segment of a dead writer
+                must be idle before it is merged
+
+        Returns:
+            True if a merged segment was written
+        """
+        city_dir = self._city_dir(key)
+        if not os.path.isdir(city_dir):
+            return False
+        with open(os.path.join(city_dir, _LOCK_FILE), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False  # another process is compacting this city
+            candidates = [p for p in self._list_segments(key) if self._is_compactable(p, min_idle_seconds)]
+            if len(candidates) < min_segments:
+                return False
+
+            cutoff = time.time() - self.retention_seconds
+            merged: List[Tuple[float, ...]] = []
+            for path in candidates:
+                with _SegmentReader(path, METRICS) as reader:
+                    columns = [reader.columns[_TS_COLUMN][:reader.rows].tolist()]
+                    columns += [reader.columns[m][:reader.rows].tolist() for m in METRICS]
+                merged.extend(row for row in zip(*columns) if row[0] >= cutoff)
+            merged.sort()
+
+            if merged:
+                name = f"{int(merged[0][0]):012d}-{os.getpid()}-c{int(time.time())}"
+                tmp_path = os.path.join(city_dir, '.' + name)
+                os.makedirs(tmp_path, exist_ok=True)
+                for index, column_name in enumerate((_TS_COLUMN, *METRICS)):
+                    with open(os.path.join(tmp_path, column_name + _COLUMN_SUFFIX), 'wb') as f:
+                        f.write(_to_array(row[index] for row in merged).tobytes())
+                self._seal(tmp_path)
+                os.rename(tmp_path, os.path.join(city_dir, name))
+            for path in candidates:
+                shutil.rmtree(path, ignore_errors=True)
+            logger.info(f"Compacted {len(candidates)} history segments for {key} ({len(merged)} rows kept)")
+            return True
+
+    def compact_all(self, **kwargs) -> int:
+        """Compact every city; returns the number of cities compacted"""
+        try:
+            keys = [k for k in os.listdir(self.root_dir) if not k.startswith('.')]
+        except FileNotFoundError:
+            return 0
+        compacted = 0
+        for key in keys:
+            try:
+                compacted += self.compact(key, **kwargs)
+            except OSError as e:
+                logger.error(f"Error compacting history for {key}: {e}")
+        return compacted
+
+
+class HistoryService:
+    """
+    Records observations off the request path and answers history queries
+
+    record() only enqueues; a background writer thread batches rows into
+    the ObservationStore and periodically compacts it. The thread is
+    started on first use in each process, so it is safe to construct the
+    service before a pre-fork server forks its workers. Every store write
+    (writer thread or the exit-time flush) holds one lock, since
+    ObservationStore keeps segment columns aligned only under a single writer.
+    """
+
+    def __init__(self, store: ObservationStore, flush_interval: float = 1.0,
+                 compact_interval: float = 600.0, max_queue: int = 10000,
+                 max_tracked_cities: int = 10000):
+        """
+        Initialize HistoryService
+
+        Args:
+            store: Backing ObservationStore
+            flush_interval: Max seconds an observation waits before being written
+            compact_interval: Seconds between compaction passes
+            max_queue: Pending observations kept before new ones are dropped
+            max_tracked_cities: Cities whose last observation time is kept
+                                for de-duplication (least recent evicted)
+        """
+        self.store = store
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=max_queue)
+        # city key -> observed_at of the last queued row; an upstream
+        # observation is refreshed well within the hour
+        self._last_recorded = TTLCache(maxsize=max_tracked_cities, ttl=3600)
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._last_compaction = time.monotonic()
+
+    def _ensure_writer(self) -> None:
+        if self._thread_pid == os.getpid() and self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread_pid == os.getpid() and self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._thread = threading.Thread(target=self._writer_loop, name='history-writer', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def record(self, weather: WeatherData) -> None:
+        """
+        Queue one observation for writing (never blocks the caller)
+
+        Args:
+            weather: Freshly fetched WeatherData
+        """
+        try:
+            key = city_key(weather.city, weather.country)
+            observed_at = float(weather.observed_at or time.time())
+            if self._last_recorded.get(key) == observed_at:
+                return  # same upstream observation already stored
+            self._last_recorded.set(key, observed_at)
+            values = {metric: getattr(weather, metric, 0) for metric in METRICS}
+            self._ensure_writer()
+            self._queue.put_nowait((key, observed_at, values))
+        except queue.Full:
+            logger.warning("History queue full, dropping observation")
+        except Exception as e:
+            logger.error(f"Error queueing observation for history: {e}")
+
+    def _drain(self, first=None) -> None:
+        with self._write_lock:
+            self._drain_locked(first)
+
+    def _drain_locked(self, first=None) -> None:
+        pending: Dict[str, List[Tuple[float, Dict[str, float]]]] = {}
+        item = first
+        while True:
+            if item is not None:
+                key, ts, values = item
+                pending.setdefault(key, []).append((ts, values))
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for key, rows in pending.items():
+            rows.sort(key=lambda r: r[0])
+            try:
+                self.store.append_rows(key, [r[0] for r in rows], [r[1] for r in rows])
+            except OSError as e:
+                logger.error(f"Error writing history for {key}: {e}")
+
+    def _writer_loop(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+            self._drain(first)
+            if time.monotonic() - self._last_compaction >= self.compact_interval:
+                self._last_compaction = time.monotonic()
+                with self._write_lock:
+                    self.store.compact_all()
+
+    def flush(self) -> None:
+        """Write pending observations and seal open segments (used at exit)"""
+        if self._thread_pid != os.getpid():
+            return
+        with self._write_lock:
+            self._drain_locked()
+            self.store.seal_all()
+
+    # ---------- queries ----------
+
+    def range(self, city: str, country: str, metric: str, hours: float = 24) -> List[Tuple[float, float]]:
+        """Raw points for the past `hours` hours"""
+        end = time.time()
+        return self.store.range(city_key(city, country), metric, end - hours * 3600, end + 1)
+
+    def downsample(self, city: str, country: str, metric: str, hours: float = 24,
+                   bucket_seconds: float = 3600) -> List[Dict[str, float]]:
+        """Bucketed min/max/mean for the past `hours` hours"""
+        end = time.time()
+        start = end - hours * 3600
+        start -= start % bucket_seconds
+        return self.store.downsample(city_key(city, country), metric, start, end + 1, bucket_seconds)
+
+    def latest(self, city: str, country: str) -> Optional[Dict[str, float]]:
+        """Most recent stored observation for a city"""
+        return self.store.latest(city_key(city, country))
+
+
+def build_trend_chart(buckets: List[Dict[str, float]], width: int = 600,
+                      height: int = 160, padding: int = 20) -> Optional[Dict]:
+    """
+    Project downsampled buckets onto SVG coordinates for the result page
+
+    Args:
+        buckets: Output of HistoryService.downsample
+        width: Chart width in px
+        height: Chart height in px
+        padding: Inner padding in px
+
+    Returns:
+        Dict with 'mean_points', 'band_points' (min/max polygon), 'min',
+        'max', 'width' and 'height', or None if fewer than two buckets
+    """
+    if len(buckets) < 2:
+        return None
+    t0, t1 = buckets[0]['ts'], buckets[-1]['ts']
+    low = min(b['min'] for b in buckets)
+    high = max(b['max'] for b in buckets)
+    span_t = (t1 - t0) or 1
+    span_v = (high - low) or 1
+
+    def project(ts: float, value: float) -> str:
+        x = padding + (ts - t0) / span_t * (width - 2 * padding)
+        y = height - padding - (value - low) / span_v * (height - 2 * padding)
+        return f"{x:.1f},{y:.1f}"
+
+    upper = [project(b['ts'], b['max']) for b in buckets]
+    lower = [project(b['ts'], b['min']) for b in reversed(buckets)]
+    return {
+        'mean_points': ' '.join(project(b['ts'], b['mean']) for b in buckets),
+        'band_points': ' '.join(upper + lower),
+        'min': round(low, 1),
+        'max': round(high, 1),
+        'width': width,
+        'height': height,
+    }
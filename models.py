@@ -3,6 +3,7 @@ Data Models for Weather App
 Defines User, Weather, and Forecast data structures
 """
 
+import math
 from datetime import datetime
 from typing import Dict, Optional, List
 
@@ -104,6 +105,7 @@ class WeatherData:
                 self.sunset = 'N/A'
             
             self.timezone = data.get('timezone', 0)
+            self.observed_at = data.get('dt', 0)
             self.rain = round(data.get('rain', {}).get('1h', 0), 1)
             self.snow = round(data.get('snow', {}).get('1h', 0), 1)
             self.wind_direction = None  # Will be set by WeatherService
@@ -136,6 +138,7 @@ class WeatherData:
             'sunrise': self.sunrise,
             'sunset': self.sunset,
             'timezone': self.timezone,
+            'observed_at': self.observed_at,
             'rain': self.rain,
             'snow': self.snow
         }
@@ -165,6 +168,7 @@ class ForecastDay:
         self.description = forecast_data.get('description', '')
         self.icon = forecast_data.get('icon', '')
         self.wind_speed = round(forecast_data.get('wind_speed', 0), 1)
+        self.wind_gust = round(forecast_data.get('wind_gust', 0), 1)
         self.rain_chance = round(forecast_data.get('rain_chance', 0), 0)
     
     def to_dict(self) -> Dict:
@@ -179,6 +183,7 @@ class ForecastDay:
             'description': self.description,
             'icon': self.icon,
             'wind_speed': self.wind_speed,
+            'wind_gust': self.wind_gust,
             'rain_chance': self.rain_chance
         }
     
@@ -186,6 +191,159 @@ class ForecastDay:
         return f"ForecastDay({self.date}, {self.day})"
 
 
+class CityLocation:
+    """Location Model - Resolved identity of a searched city"""
+    
+    def __init__(self, city_id: Optional[int], name: str, country: str,
+                 latitude: float, longitude: float):
+        """
+        Initialize a resolved city location
+        
+        Args:
+            city_id: OpenWeather city ID (None if the API did not return one)
+            name: Canonical city name
+            country: Country code
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
+        """
+        self.city_id = city_id
+        self.name = name
+        self.country = country
+        self.latitude = round(latitude, 4)
+        self.longitude = round(longitude, 4)
+    
+    @staticmethod
+    def from_weather_response(data: Dict) -> Optional['CityLocation']:
+        """Build from a current-weather response (top-level id/name/coord)"""
+        coord = data.get('coord')
+        if not coord:
+            return None
+        return CityLocation(
+            city_id=data.get('id') or None,
+            name=data.get('name', 'Unknown'),
+            country=data.get('sys', {}).get('country', 'N/A'),
+            latitude=coord.get('lat', 0),
+            longitude=coord.get('lon', 0)
+        )
+    
+    @staticmethod
+    def from_forecast_response(data: Dict) -> Optional['CityLocation']:
+        """Build from the embedded 'city' block of a forecast response"""
+        city = data.get('city')
+        if not city or not city.get('coord'):
+            return None
+        return CityLocation(
+            city_id=city.get('id') or None,
+            name=city.get('name', 'Unknown'),
+            country=city.get('country', 'N/A'),
+            latitude=city['coord'].get('lat', 0),
+            longitude=city['coord'].get('lon', 0)
+        )
+    
+    def query_params(self) -> Dict:
+        """Upstream query parameters addressing this location without text search"""
+        if self.city_id:
+            return {'id': self.city_id}
+        return {'lat': self.latitude, 'lon': self.longitude}
+    
+    def cache_key(self) -> str:
+        """Key shared by every spelling of the same location"""
+        if self.city_id:
+            return f"id:{self.city_id}"
+        return f"coord:{self.latitude:.2f},{self.longitude:.2f}"
+    
+    def to_dict(self) -> Dict:
+        """Convert location to dictionary"""
+        return {
+            'city_id': self.city_id,
+            'name': self.name,
+            'country': self.country,
+            'latitude': self.latitude,
+            'longitude': self.longitude
+        }
+    
+    def __repr__(self) -> str:
+        return f"CityLocation({self.name}, {self.country})"
+
+
+class AlertRule:
+    """Alert Model - A user's threshold rule on a city's forecast"""
+    
+    # Alertable ForecastDay field -> unit kind its threshold is entered in
+    FIELD_KINDS = {
+        'rain_chance': 'percent',
+        'humidity': 'percent',
+        'wind_speed': 'wind',
+        'wind_gust': 'wind',
+        'temp_max': 'temperature',
+        'temp_min': 'temperature',
+    }
+    FIELDS = tuple(FIELD_KINDS)
+    OPERATORS = ('>', '>=', '<', '<=')
+    FORECAST_DAYS = 5
+    
+    def __init__(self, rule_id: str, user_email: str, city: str, field: str, operator: str,
+                 threshold: float, day_offset: Optional[int] = None, created_at: Optional[str] = None):
+        """
+        Initialize an alert rule
+        
+        Args:
+            rule_id: Unique rule identifier
+            user_email: Owner of the rule
+            city: City name as entered by the user
+            field: ForecastDay attribute to test (one of FIELDS)
+            operator: Comparison operator (one of OPERATORS)
+            threshold: Threshold in canonical metric units
+            day_offset: 0 = today, 1 = tomorrow, ...; None = any forecast day
+            created_at: Rule creation timestamp
+        """
+        if field not in self.FIELDS:
+            raise ValueError(f"Unsupported alert field: {field}")
+        if operator not in self.OPERATORS:
+            raise ValueError(f"Unsupported alert operator: {operator}")
+        if not math.isfinite(float(threshold)):
+            raise ValueError(f"Alert threshold must be a finite number: {threshold}")
+        if day_offset is not None and day_offset < 0:
+            raise ValueError(f"Alert day offset must not be negative: {day_offset}")
+        self.rule_id = rule_id
+        self.user_email = user_email
+        self.city = city
+        self.field = field
+        self.operator = operator
+        self.threshold = float(threshold)
+        self.day_offset = day_offset
+        self.created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    def to_dict(self) -> Dict:
+        """Convert rule to dictionary for storage"""
+        return {
+            'user_email': self.user_email,
+            'city': self.city,
+            'field': self.field,
+            'operator': self.operator,
+            'threshold': self.threshold,
+            'day_offset': self.day_offset,
+            'created_at': self.created_at
+        }
+    
+    @staticmethod
+    def from_dict(rule_id: str, data: Dict) -> 'AlertRule':
+        """Create AlertRule instance from dictionary"""
+        return AlertRule(
+            rule_id=rule_id,
+            user_email=data['user_email'],
+            city=data['city'],
+            field=data['field'],
+            operator=data['operator'],
+            threshold=data['threshold'],
+            day_offset=data.get('day_offset'),
+            created_at=data.get('created_at')
+        )
+    
+    def __repr__(self) -> str:
+        return f"AlertRule({self.city} {self.field} {self.operator} {self.threshold})"
+
+
 class Session:
     """Session Model - Represents user session"""
     
@@ -0,0 +1,119 @@
+"""
+Production server for the Weather App
+Runs the app under a pre-fork Gunicorn master with threaded workers
+
+Usage:
+    python serve.py [--bind 0.0.0.0:8000] [--workers N] [--threads N]
+
+Signals (sent to the master process):
+    HUP   Graceful rolling reload - new workers are started from the
+          preloaded app and old workers finish their in-flight requests
+    USR2  Re-exec the master with new code (follow with WINCH/QUIT on
+          the old master for a zero-downtime code upgrade)
+    TERM  Graceful shutdown
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+
+from gunicorn.app.base import BaseApplication
+
+from utils.app_logger import configure_logging, logger, reopen_log_files
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+def default_options() -> dict:
+    """Server options, overridable through WEATHER_* environment variables"""
+    cores = multiprocessing.cpu_count()
+    return {
+        'bind': os.environ.get('WEATHER_BIND', '0.0.0.0:8000'),
+        'workers': _env_int('WEATHER_WORKERS', cores),
+        'worker_class': 'gthread',
+        'threads': _env_int('WEATHER_THREADS', 24),
+        'preload_app': True,
+        'max_requests': _env_int('WEATHER_MAX_REQUESTS', 5000),
+        'max_requests_jitter': _env_int('WEATHER_MAX_REQUESTS_JITTER', 500),
+        'timeout': _env_int('WEATHER_WORKER_TIMEOUT', 30),
+        'graceful_timeout': _env_int('WEATHER_GRACEFUL_TIMEOUT', 30),
+        'keepalive': 5,
+    }
+
+
+def post_fork(server, worker) -> None:
+    """Gunicorn hook - runs in each worker right after fork"""
+    reopen_log_files()
+    logger.info(f"Worker {worker.pid} started")
+
+
+class WeatherAppServer(BaseApplication):
+    """Gunicorn application that preloads and warms the Weather App before forking"""
+    
+    def __init__(self, options: dict):
+        """
+        Initialize WeatherAppServer
+        
+        Args:
+            options: Gunicorn settings (see default_options)
+        """
+        self.options = options
+        super().__init__()
+    
+    def load_config(self) -> None:
+        """Apply options to the Gunicorn config"""
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+        self.cfg.set('post_fork', post_fork)
+    
+    def load(self):
+        """
+        Build and warm the app in the master process
+        
+        With preload_app the result is inherited by every forked worker.
+        gc.freeze() moves the warmed objects out of the collector's reach so
+        collections in workers do not touch (and un-share) those pages.
+        """
+        from app import create_app, warm_up
+        
+        app = create_app()
+        warm_up(app)
+        gc.freeze()
+        return app
+
+
+def main() -> None:
+    # Workers share one log file, so size rotation (which each process would
+    # do on its own) is off; the app's LOG_DIR still applies once loaded
+    configure_logging(os.environ.get('WEATHER_LOG_DIR', 'logs'), rotate=False)
+    options = default_options()
+    parser = argparse.ArgumentParser(description='Run the Weather App production server')
+    parser.add_argument('--bind', default=options['bind'], help='address to listen on (host:port)')
+    parser.add_argument('--workers', type=int, default=options['workers'], help='worker processes (default: CPU cores)')
+    parser.add_argument('--threads', type=int, default=options['threads'], help='threads per worker')
+    parser.add_argument('--max-requests', type=int, default=options['max_requests'],
+                        help='recycle a worker after this many requests (0 disables)')
+    args = parser.parse_args()
+    
+    options.update({
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'max_requests': args.max_requests,
+    })
+    logger.info(f"Starting production server on {options['bind']} with "
+                f"{options['workers']} workers x {options['threads']} threads")
+    WeatherAppServer(options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,15 @@ Handles business logic for user management, authentication, and weather operatio
 
 import os
 import json
+import threading
 import requests
 from datetime import datetime
-from typing import Dict, List, Optional
-from models import User, WeatherData, ForecastDay
+from typing import Callable, Dict, List, Optional, Tuple
+from models import User, WeatherData, ForecastDay, CityLocation
 from utils.app_logger import logger
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.hedging import HedgedRequester
+from utils.ttl_cache import TTLCache
 
 
 class UserService:
@@ -17,10 +21,40 @@ class UserService:
     
     USERS_FILE = 'users.json'
     
-    def __init__(self):
-        """Initialize UserService"""
+    def __init__(self, users_file: Optional[str] = None):
+        """
+        Initialize UserService
+        
+        Args:
+            users_file: Path to the users JSON file (defaults to USERS_FILE)
+        """
+        if users_file:
+            self.USERS_FILE = users_file
+        self._lock = threading.Lock()
+        self._mtime = self._file_mtime()
         self.users = self._load_users()
     
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.USERS_FILE)
+        except OSError:
+            return None
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Reload users if another process (e.g. another server worker) rewrote the file
+        
+        Returns:
+            True if users were reloaded
+        """
+        mtime = self._file_mtime()
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            self._mtime = mtime
+            self.users = self._load_users()
+        return True
+    
     def _load_users(self) -> Dict:
         """
         Load users from JSON file
@@ -47,10 +81,13 @@ class UserService:
     
     def _save_users(self) -> None:
         """Save users to JSON file"""
+        tmp_file = f"{self.USERS_FILE}.tmp"
         try:
-            with open(self.USERS_FILE, 'w') as f:
+            with open(tmp_file, 'w') as f:
                 json.dump(self.users, f, indent=4)
-                logger.info(f"Users successfully saved to {self.USERS_FILE}")
+            os.replace(tmp_file, self.USERS_FILE)
+            self._mtime = self._file_mtime()
+            logger.info(f"Users successfully saved to {self.USERS_FILE}")
         except IOError as e:
             logger.error(f"IO Error writing to {self.USERS_FILE}: {e}")
             raise
@@ -79,18 +116,21 @@ class UserService:
                 logger.warning("Registration attempt with missing fields")
                 return False
             
-            if email in self.users:
-                logger.warning(f"Registration attempt with existing email: {email}")
-                return False
-            
             if len(password) < 6:
                 logger.warning(f"Registration attempt with weak password for email: {email}")
                 return False
             
-            # Create new user
-            user = User(email, username, password)
-            self.users[email] = user.to_dict()
-            self._save_users()
+            # Re-read first so a save never drops users added by another worker
+            self.reload_if_changed()
+            with self._lock:
+                if email in self.users:
+                    logger.warning(f"Registration attempt with existing email: {email}")
+                    return False
+                
+                # Create new user
+                user = User(email, username, password)
+                self.users[email] = user.to_dict()
+                self._save_users()
             
             logger.info(f"New user registered successfully: {email}")
             return True
@@ -117,6 +157,7 @@ class UserService:
             
             logger.debug(f"Authentication attempt for email: {email}")
             
+            self.reload_if_changed()
             if email not in self.users:
                 logger.warning(f"Authentication failed: user not found - {email}")
                 return None
@@ -137,11 +178,13 @@ class UserService:
     
     def user_exists(self, email: str) -> bool:
         """Check if user exists"""
+        self.reload_if_changed()
         return email in self.users
     
     def get_user(self, email: str) -> Optional[User]:
         """Get user by email"""
         try:
+            self.reload_if_changed()
             if email in self.users:
                 return User.from_dict(email, self.users[email])
             return None
@@ -156,15 +199,201 @@ class WeatherService:
     CURRENT_WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
     FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
     REQUEST_TIMEOUT = 10
+    CURRENT_CACHE_TTL = 300
+    FORECAST_CACHE_TTL = 900
+    RESOLUTION_CACHE_SIZE = 10000
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, on_observation: Optional[Callable[[WeatherData], None]] = None,
+                 requester: Optional[HedgedRequester] = None):
         """
         Initialize WeatherService
         
         Args:
             api_key: OpenWeather API key
+            on_observation: Optional callback receiving every WeatherData
+                            fetched successfully (e.g. HistoryService.record)
+            requester: Runs upstream calls that carry a deadline (and
+                       hedges them if enabled); defaults to no hedging
         """
         self.api_key = api_key
+        self.on_observation = on_observation
+        self.requester = requester or HedgedRequester()
+        # Normalized search text -> CityLocation; resolutions do not expire
+        self._resolutions = TTLCache(maxsize=self.RESOLUTION_CACHE_SIZE, ttl=None)
+        # (endpoint, location key) -> raw upstream payload
+        self._payloads = TTLCache(maxsize=self.RESOLUTION_CACHE_SIZE)
+    
+    @staticmethod
+    def _normalize_query(city: str) -> str:
+        """Normalize user-typed city text for resolution lookups"""
+        return ' '.join(city.lower().split())
+    
+    def resolve_city(self, city: str) -> Optional[CityLocation]:
+        """
+        Return the cached resolution of a city search, if any
+        
+        Args:
+            city: City name as typed by the user
+            
+        Returns:
+            CityLocation if the city was resolved before, None otherwise
+        """
+        return self._resolutions.get(self._normalize_query(city))
+    
+    def is_cached(self, city: str, endpoint: str) -> bool:
+        """
+        Check whether a request would be served without an upstream call
+        
+        Args:
+            city: City name as typed by the user
+            endpoint: 'weather' or 'forecast'
+            
+        Returns:
+            True if a fresh payload is cached for the city
+        """
+        return self._cache_key(endpoint, city) in self._payloads
+    
+    def get_cached_weather(self, city: str) -> Optional[WeatherData]:
+        """
+        Return current weather only if it is already cached (never calls upstream)
+        
+        Args:
+            city: City name
+            
+        Returns:
+            WeatherData built from the cached payload, None on a cache miss
+        """
+        data = self._payloads.get(self._cache_key('weather', city))
+        if data is None:
+            return None
+        try:
+            weather = WeatherData(data)
+            weather.wind_direction = self._get_wind_direction(weather.wind_deg)
+            return weather
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Error creating WeatherData object from cache for {city}: {e}")
+            return None
+    
+    def _remember_location(self, city: str, location: Optional[CityLocation]) -> None:
+        """
+        Cache a resolution under the typed text and the unambiguous "name,country" form
+        
+        The bare canonical name is never cached: "London" typed after a search
+        for "London,CA" must still go upstream rather than inherit Ontario.
+        """
+        if not location:
+            return
+        self._resolutions.set(self._normalize_query(city), location)
+        self._resolutions.set(self._normalize_query(f"{location.name},{location.country}"), location)
+    
+    def _location_params(self, city: str) -> Dict:
+        """ID/coordinate parameters for a resolved city, else a text query"""
+        location = self.resolve_city(city)
+        if location:
+            return location.query_params()
+        return {'q': city}
+    
+    def _cache_key(self, endpoint: str, city: str) -> str:
+        """Payload cache key - shared by every spelling of a resolved city"""
+        location = self.resolve_city(city)
+        if location:
+            return f"{endpoint}|{location.cache_key()}"
+        return f"{endpoint}|q:{self._normalize_query(city)}"
+    
+    def _send(self, url: str, params: Dict, timeout: float,
+              cancelled: Optional[threading.Event] = None) -> Dict:
+        """
+        Perform one upstream GET and decode its JSON body
+        
+        The body is streamed so an attempt that lost a hedge race (or
+        outlived its deadline) closes the connection instead of reading it.
+        
+        Raises:
+            requests.exceptions.RequestException: On transport or HTTP errors
+            DeadlineExceeded: If no time is left, or the attempt was abandoned
+                              before reading the body
+        """
+        # An attempt that started at (or queued past) its deadline must not
+        # reach requests, which rejects a zero timeout with ValueError
+        if timeout <= 0:
+            raise DeadlineExceeded("No time left for upstream attempt")
+        response = requests.get(url, params=params, timeout=timeout, stream=True)
+        try:
+            if cancelled is not None and cancelled.is_set():
+                raise DeadlineExceeded("Upstream attempt abandoned")
+            response.raise_for_status()
+            return response.json()
+        finally:
+            response.close()
+    
+    def _fetch(self, url: str, city: str, endpoint: str, ttl: float,
+               locate: Callable[[Dict], Optional[CityLocation]],
+               deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Fetch an upstream payload, serving repeats from the payload cache
+        
+        A successful response resolves the city, and the payload is cached
+        under the resolved (ID/coordinate) key so any later spelling of the
+        same city is a cache hit.
+        
+        With a deadline the call never blocks past it: the per-attempt
+        timeout shrinks to the remaining budget and the attempt runs through
+        the requester, which may hedge it.
+        
+        Args:
+            url: Upstream endpoint URL
+            city: City name as typed by the user
+            endpoint: Short label used in logs and cache keys
+            ttl: Seconds a successful payload is reused
+            locate: Extracts the CityLocation from a payload
+            deadline: Optional time budget shared with the rest of the page
+            
+        Returns:
+            Decoded JSON payload with cod 200, None on any error
+        """
+        cache_key = self._cache_key(endpoint, city)
+        cached = self._payloads.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Serving cached {endpoint} payload for city: {city}")
+            return cached
+        
+        params = self._location_params(city)
+        params.update({
+            'appid': self.api_key,
+            'units': 'metric'
+        })
+        
+        try:
+            if deadline is None:
+                data = self._send(url, params, self.REQUEST_TIMEOUT)
+            else:
+                data = self.requester.call(
+                    lambda cancelled: self._send(url, params, deadline.timeout(self.REQUEST_TIMEOUT), cancelled),
+                    deadline,
+                    label=endpoint
+                )
+        except DeadlineExceeded:
+            logger.error(f"Deadline exceeded fetching {endpoint} for city: {city}")
+            return None
+        except requests.exceptions.Timeout:
+            logger.error(f"Timeout error fetching {endpoint} for city: {city}")
+            return None
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"HTTP error fetching {endpoint} for city: {city} - {e}")
+            return None
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error fetching {endpoint} for city: {city} - {e}")
+            return None
+        
+        # Handle both string and integer cod values
+        cod = data.get('cod')
+        if str(cod) != '200':
+            logger.warning(f"City not found in {endpoint}: {city}. API Response code: {cod}")
+            return None
+        
+        self._remember_location(city, locate(data))
+        self._payloads.set(self._cache_key(endpoint, city), data, ttl)
+        return data
     
     def _get_wind_direction(self, degrees: float) -> str:
         """
@@ -189,12 +418,17 @@ class WeatherService:
             logger.error(f"Unexpected error in get_wind_direction: {e}")
             return 'N'
     
-    def get_current_weather(self, city: str) -> Optional[WeatherData]:
+    def get_current_weather(self, city: str, deadline: Optional[Deadline] = None) -> Optional[WeatherData]:
         """
         Fetch current weather for a city
         
+        The first lookup of a city uses a text query; the resolved city ID is
+        cached so later lookups (any spelling) are ID-based and share one
+        cached payload.
+        
         Args:
             city: City name
+            deadline: Optional page time budget bounding the upstream call
             
         Returns:
             WeatherData object if successful, None otherwise
@@ -202,34 +436,9 @@ class WeatherService:
         try:
             logger.info(f"Fetching weather data for city: {city}")
             
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
-            
-            try:
-                response = requests.get(
-                    self.CURRENT_WEATHER_URL,
-                    params=params,
-                    timeout=self.REQUEST_TIMEOUT
-                )
-                response.raise_for_status()
-                data = response.json()
-            except requests.exceptions.Timeout:
-                logger.error(f"Timeout error fetching weather for city: {city}")
-                return None
-            except requests.exceptions.HTTPError as e:
-                logger.error(f"HTTP error fetching weather for city: {city} - {e}")
-                return None
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error fetching weather for city: {city} - {e}")
-                return None
-            
-            # Handle both string and integer cod values
-            cod = data.get('cod')
-            if str(cod) != '200':
-                logger.warning(f"City not found: {city}. API Response code: {cod}")
+            data = self._fetch(self.CURRENT_WEATHER_URL, city, 'weather', self.CURRENT_CACHE_TTL,
+                               CityLocation.from_weather_response, deadline)
+            if data is None:
                 return None
             
             try:
@@ -241,113 +450,189 @@ class WeatherService:
                 return None
             
             logger.debug(f"Successfully extracted weather data for {weather.city}, {weather.country}")
+            if self.on_observation:
+                self.on_observation(weather)
             return weather
         
         except Exception as e:
             logger.error(f"Unexpected error fetching weather for city {city}: {e}")
             return None
     
-    def get_forecast(self, city: str) -> Optional[List[ForecastDay]]:
+    def get_forecast(self, city: str, deadline: Optional[Deadline] = None) -> Optional[List[ForecastDay]]:
         """
         Fetch 5-day forecast for a city
         
         Args:
             city: City name
+            deadline: Optional page time budget bounding the upstream call
             
         Returns:
             List of ForecastDay objects if successful, None otherwise
         """
+        forecast, _location = self.get_forecast_with_location(city, deadline)
+        return forecast
+    
+    def get_forecast_with_location(self, city: str, deadline: Optional[Deadline] = None
+                                   ) -> Tuple[Optional[List[ForecastDay]], Optional[CityLocation]]:
+        """
+        Fetch 5-day forecast together with the city block embedded in the response
+        
+        Callers needing coordinates (e.g. the forecast map) use the returned
+        location instead of making a second current-weather request.
+        
+        Args:
+            city: City name
+            deadline: Optional page time budget bounding the upstream call
+            
+        Returns:
+            Tuple of (ForecastDay list or None, CityLocation or None)
+        """
         try:
             logger.info(f"Fetching 5-day forecast for city: {city}")
             
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
+            data = self._fetch(self.FORECAST_URL, city, 'forecast', self.FORECAST_CACHE_TTL,
+                               CityLocation.from_forecast_response, deadline)
+            if data is None:
+                return None, None
             
-            try:
-                response = requests.get(
-                    self.FORECAST_URL,
-                    params=params,
-                    timeout=self.REQUEST_TIMEOUT
-                )
-                response.raise_for_status()
-                data = response.json()
-            except requests.exceptions.Timeout:
-                logger.error(f"Timeout error fetching forecast for city: {city}")
-                return None
-            except requests.exceptions.HTTPError as e:
-                logger.error(f"HTTP error fetching forecast for city: {city} - {e}")
-                return None
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error fetching forecast for city: {city} - {e}")
-                return None
+            return self._aggregate_forecast(data, city), self.resolve_city(city)
+        
+        except Exception as e:
+            logger.error(f"Unexpected error fetching forecast for city {city}: {e}")
+            return None, None
+    
+    def _aggregate_forecast(self, data: Dict, city: str) -> Optional[List[ForecastDay]]:
+        """
+        Collapse 3-hourly forecast entries into at most 5 ForecastDay objects
+        
+        Args:
+            data: Forecast payload from the API
+            city: City name (for logging)
             
-            # Handle both string and integer cod values
-            cod = data.get('cod')
-            if str(cod) != '200':
-                logger.warning(f"City not found in forecast: {city}. API Response code: {cod}")
-                return None
+        Returns:
+            List of ForecastDay objects, None if nothing usable
+        """
+        # Process forecast data
+        forecast_list = data.get('list', [])
+        if not forecast_list:
+            logger.warning(f"No forecast data available for {city}")
+            return None
             
-            # Process forecast data
-            forecast_list = data.get('list', [])
-            if not forecast_list:
-                logger.warning(f"No forecast data available for {city}")
-                return None
+        daily_forecasts = {}
+        
+        for forecast in forecast_list:
+            try:
+                dt = datetime.fromtimestamp(forecast['dt'])
+                date_key = dt.strftime('%Y-%m-%d')
+                day_name = dt.strftime('%A')
                 
-            daily_forecasts = {}
-            
-            for forecast in forecast_list:
-                try:
-                    dt = datetime.fromtimestamp(forecast['dt'])
-                    date_key = dt.strftime('%Y-%m-%d')
-                    day_name = dt.strftime('%A')
-                    
-                    # Store forecast data for each day
-                    if date_key not in daily_forecasts:
-                        daily_forecasts[date_key] = {
-                            'day': day_name,
-                            'temp_max': forecast['main'].get('temp_max', 0),
-                            'temp_min': forecast['main'].get('temp_min', 0),
-                            'temp': forecast['main'].get('temp', 0),
-                            'humidity': forecast['main'].get('humidity', 0),
-                            'description': forecast['weather'][0].get('description', '').title() if forecast.get('weather') else 'N/A',
-                            'icon': forecast['weather'][0].get('icon', '') if forecast.get('weather') else '',
-                            'wind_speed': forecast['wind'].get('speed', 0),
-                            'rain_chance': round((forecast.get('pop', 0) * 100), 1),
-                        }
-                    else:
-                        # Update with max/min values
-                        if forecast['main'].get('temp_max', 0) > daily_forecasts[date_key]['temp_max']:
-                            daily_forecasts[date_key]['temp_max'] = forecast['main'].get('temp_max', 0)
-                        if forecast['main'].get('temp_min', 0) < daily_forecasts[date_key]['temp_min']:
-                            daily_forecasts[date_key]['temp_min'] = forecast['main'].get('temp_min', 0)
-                except (KeyError, ValueError, TypeError) as e:
-                    logger.warning(f"Error processing forecast item: {e}, skipping")
-                    continue
-                except Exception as e:
-                    logger.warning(f"Unexpected error processing forecast item: {e}, skipping")
-                    continue
-            
-            if not daily_forecasts:
-                logger.warning(f"No valid forecast data available for {city}")
-                return None
-            
-            # Create ForecastDay objects and return first 5 days
-            result = []
-            for date_key in list(daily_forecasts.keys())[:5]:
-                forecast_data = daily_forecasts[date_key]
-                try:
-                    forecast_day = ForecastDay(date_key, forecast_data['day'], forecast_data)
-                    result.append(forecast_day)
-                except Exception as e:
-                    logger.warning(f"Error creating ForecastDay object for {date_key}: {e}")
-                    continue
-            
-            logger.info(f"Successfully fetched forecast with {len(result)} days for {city}")
-            return result
+                # Store forecast data for each day
+                if date_key not in daily_forecasts:
+                    daily_forecasts[date_key] = {
+                        'day': day_name,
+                        'temp_max': forecast['main'].get('temp_max', 0),
+                        'temp_min': forecast['main'].get('temp_min', 0),
+                        'temp': forecast['main'].get('temp', 0),
+                        'humidity': forecast['main'].get('humidity', 0),
+                        'description': forecast['weather'][0].get('description', '').title() if forecast.get('weather') else 'N/A',
+                        'icon': forecast['weather'][0].get('icon', '') if forecast.get('weather') else '',
+                        'wind_speed': forecast['wind'].get('speed', 0),
+                        'wind_gust': forecast['wind'].get('gust', 0),
+                        'rain_chance': round((forecast.get('pop', 0) * 100), 1),
+                    }
+                else:
+                    # Update with max/min values
+                    if forecast['main'].get('temp_max', 0) > daily_forecasts[date_key]['temp_max']:
+                        daily_forecasts[date_key]['temp_max'] = forecast['main'].get('temp_max', 0)
+                    if forecast['main'].get('temp_min', 0) < daily_forecasts[date_key]['temp_min']:
+                        daily_forecasts[date_key]['temp_min'] = forecast['main'].get('temp_min', 0)
+                    if forecast['wind'].get('gust', 0) > daily_forecasts[date_key]['wind_gust']:
+                        daily_forecasts[date_key]['wind_gust'] = forecast['wind'].get('gust', 0)
+                    if forecast.get('pop', 0) * 100 > daily_forecasts[date_key]['rain_chance']:
+                        daily_forecasts[date_key]['rain_chance'] = round(forecast.get('pop', 0) * 100, 1)
+            except (KeyError, ValueError, TypeError) as e:
+                logger.warning(f"Error processing forecast item: {e}, skipping")
+                continue
+            except Exception as e:
+                logger.warning(f"Unexpected error processing forecast item: {e}, skipping")
+                continue
         
-        except Exception as e:
-            logger.error(f"Unexpected error fetching forecast for city {city}: {e}")
+        if not daily_forecasts:
+            logger.warning(f"No valid forecast data available for {city}")
             return None
+        
+        # Create ForecastDay objects and return first 5 days
+        result = []
+        for date_key in list(daily_forecasts.keys())[:5]:
+            forecast_data = daily_forecasts[date_key]
+            try:
+                forecast_day = ForecastDay(date_key, forecast_data['day'], forecast_data)
+                result.append(forecast_day)
+            except Exception as e:
+                logger.warning(f"Error creating ForecastDay object for {date_key}: {e}")
+                continue
+        
+        logger.info(f"Successfully fetched forecast with {len(result)} days for {city}")
+        return result
+
+
+class ServiceRegistry:
+    """
+    Lazily constructs and caches the services used by one application
+
+    Each service is registered as a zero-argument factory and is only built
+    the first time it is requested, so creating the app does not load user
+    data or set up HTTP clients. Tests and callers can inject ready-made
+    instances with override().
+    """
+    
+    def __init__(self, factories: Optional[Dict[str, Callable[[], object]]] = None):
+        """
+        Initialize ServiceRegistry
+        
+        Args:
+            factories: Mapping of service name to a zero-argument factory
+        """
+        self._factories: Dict[str, Callable[[], object]] = dict(factories or {})
+        self._instances: Dict[str, object] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, name: str, factory: Callable[[], object]) -> None:
+        """Register (or replace) the factory for a service"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+    
+    def override(self, name: str, instance: object) -> None:
+        """Inject an already constructed service instance"""
+        with self._lock:
+            self._instances[name] = instance
+    
+    def is_initialized(self, name: str) -> bool:
+        """Check whether a service has already been constructed"""
+        return name in self._instances
+    
+    def get(self, name: str):
+        """
+        Return a service, constructing it on first use
+        
+        Args:
+            name: Registered service name
+            
+        Returns:
+            The service instance
+            
+        Raises:
+            KeyError: If no factory is registered under name
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                factory = self._factories[name]
+                logger.debug(f"Initializing service: {name}")
+                instance = factory()
+                self._instances[name] = instance
+            return instance
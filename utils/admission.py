@@ -0,0 +1,135 @@
+"""
+Admission Control for Weather App
+Bounded concurrency pools with deadline-based queueing and load shedding
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from utils.app_logger import logger
+
+
+class AdmissionPool:
+    """
+    Limits how many requests of one route class run at once
+
+    Up to max_concurrent requests run; up to max_queue more wait for a slot
+    until their queue deadline. Anything beyond that is shed immediately so
+    threads are never parked behind an unbounded backlog.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        """
+        Initialize AdmissionPool
+
+        Args:
+            name: Route class name (for stats and logs)
+            max_concurrent: Requests allowed to run at the same time
+            max_queue: Requests allowed to wait for a slot
+            queue_timeout: Default seconds a request may wait before being shed
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self._avg_service = 1.0  # EWMA of seconds a slot is held
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """
+        Take a slot, waiting at most until the deadline
+
+        Args:
+            deadline: time.monotonic() value after which waiting is pointless
+                      (defaults to now + queue_timeout)
+
+        Returns:
+            True if admitted (caller must release()), False if shed
+        """
+        with self._cond:
+            if self.active < self.max_concurrent and self.queued == 0:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if self.queued >= self.max_queue:
+                self.shed_queue_full += 1
+                return False
+
+            if deadline is None:
+                deadline = time.monotonic() + self.queue_timeout
+            self.queued += 1
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed_timeout += 1
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                self.admitted += 1
+                return True
+            finally:
+                self.queued -= 1
+
+    def release(self, held_for: Optional[float] = None) -> None:
+        """
+        Free a slot taken by acquire()
+
+        Args:
+            held_for: Seconds the slot was held (feeds the Retry-After estimate)
+        """
+        with self._cond:
+            self.active -= 1
+            if held_for is not None:
+                self._avg_service = 0.8 * self._avg_service + 0.2 * held_for
+            self._cond.notify()
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait, from queue depth and service time"""
+        backlog = self.queued + self.active
+        return max(1, math.ceil(backlog * self._avg_service / max(self.max_concurrent, 1)))
+
+    def stats(self) -> Dict:
+        """Current depth and cumulative counters"""
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'queued': self.queued,
+                'admitted': self.admitted,
+                'shed_queue_full': self.shed_queue_full,
+                'shed_timeout': self.shed_timeout,
+                'avg_service_ms': round(self._avg_service * 1000, 1),
+            }
+
+
+class AdmissionController:
+    """Maps route classes to their AdmissionPool"""
+
+    def __init__(self, pool_config: Dict[str, Dict]):
+        """
+        Initialize AdmissionController
+
+        Args:
+            pool_config: {route_class: {'max_concurrent': int, 'max_queue': int,
+                          'queue_timeout': float}}
+        """
+        self.pools = {
+            name: AdmissionPool(name, cfg['max_concurrent'], cfg['max_queue'], cfg['queue_timeout'])
+            for name, cfg in pool_config.items()
+        }
+        logger.debug(f"Admission pools configured: {', '.join(self.pools)}")
+
+    def pool(self, route_class: str) -> Optional[AdmissionPool]:
+        return self.pools.get(route_class)
+
+    def stats(self) -> Dict:
+        return {name: pool.stats() for name, pool in self.pools.items()}
@@ -1,25 +1,59 @@
 import logging
 import logging.handlers
 import os
+import threading
 from datetime import datetime
 
+
+class _LazyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that creates its directory and file on first write"""
+
+    def _open(self):
+        directory = os.path.dirname(self.baseFilename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        return super()._open()
+
+
+class _LazyWatchedFileHandler(logging.handlers.WatchedFileHandler):
+    """
+    Non-rotating file handler for multi-process serving
+
+    Several workers appending to one file is safe, but each rotating it at
+    its own size check is not. Rotation is left to an external tool; the
+    handler reopens the file once it has been moved away.
+    """
+
+    def _open(self):
+        directory = os.path.dirname(self.baseFilename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        return super()._open()
+
+
 class AppLogger:
     """Logger utility for the Weather App"""
     
-    def __init__(self, log_dir='logs'):
-        """Initialize logger with file and console handlers"""
-        self.log_dir = log_dir
+    def __init__(self, log_dir='logs', rotate=True):
+        """
+        Attach file and console handlers to the WeatherApp logger
         
-        # Create logs directory if it doesn't exist
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+        The log directory and file are not touched until the first record is
+        written, so configuring the logger has no filesystem side effects.
+        
+        Args:
+            log_dir: Directory for the log file
+            rotate: Rotate the file by size (single process only)
+        """
+        self.log_dir = log_dir
+        self.rotate = rotate
         
         # Create logger
         self.logger = logging.getLogger('WeatherApp')
         self.logger.setLevel(logging.DEBUG)
         
         # Create formatters
-        detailed_formatter = logging.Formatter(
+        self.detailed_formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
@@ -29,15 +63,8 @@ class AppLogger:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         
-        # File handler - logs everything
-        log_file = os.path.join(log_dir, f'weather_app_{datetime.now().strftime("%Y%m%d")}.log')
-        file_handler = logging.handlers.RotatingFileHandler(
-            log_file,
-            maxBytes=5*1024*1024,  # 5MB
-            backupCount=5
-        )
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(detailed_formatter)
+        # File handler - logs everything (opened lazily on first emit)
+        self.file_handler = self._build_file_handler()
         
         # Console handler - logs warnings and above
         console_handler = logging.StreamHandler()
@@ -45,14 +72,93 @@ class AppLogger:
         console_handler.setFormatter(simple_formatter)
         
         # Add handlers to logger
-        self.logger.addHandler(file_handler)
+        self.logger.addHandler(self.file_handler)
         self.logger.addHandler(console_handler)
     
+    def _build_file_handler(self):
+        """Create the (not yet opened) file handler for log_dir"""
+        log_file = os.path.join(self.log_dir, f'weather_app_{datetime.now().strftime("%Y%m%d")}.log')
+        if self.rotate:
+            file_handler = _LazyRotatingFileHandler(
+                log_file,
+                maxBytes=5*1024*1024,  # 5MB
+                backupCount=5,
+                delay=True
+            )
+        else:
+            file_handler = _LazyWatchedFileHandler(log_file, delay=True)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(self.detailed_formatter)
+        return file_handler
+    
+    def update(self, log_dir=None, rotate=None):
+        """
+        Re-point the file handler at another directory or rotation mode
+        
+        Args:
+            log_dir: New directory (None keeps the current one)
+            rotate: New rotation mode (None keeps the current one)
+        """
+        log_dir = self.log_dir if log_dir is None else log_dir
+        rotate = self.rotate if rotate is None else rotate
+        if (log_dir, rotate) == (self.log_dir, self.rotate):
+            return
+        self.log_dir = log_dir
+        self.rotate = rotate
+        old_handler = self.file_handler
+        self.file_handler = self._build_file_handler()
+        self.logger.addHandler(self.file_handler)
+        self.logger.removeHandler(old_handler)
+        old_handler.close()
+    
+    def reopen(self):
+        """Drop the file stream inherited across fork; the next record opens its own"""
+        self.file_handler.acquire()
+        try:
+            if self.file_handler.stream is not None:
+                self.file_handler.stream.close()
+                self.file_handler.stream = None
+        finally:
+            self.file_handler.release()
+    
     def get_logger(self):
         """Return the configured logger instance"""
         return self.logger
 
 
-# Initialize logger
-_app_logger = AppLogger()
-logger = _app_logger.get_logger()
+# Handlers are attached by configure_logging(), normally from create_app()
+logger = logging.getLogger('WeatherApp')
+
+_app_logger = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(log_dir=None, rotate=None):
+    """
+    Attach the application handlers to the WeatherApp logger
+
+    Calling it again with another directory re-points the file handler, so
+    an app created with its own LOG_DIR is not bound to the first one.
+
+    Args:
+        log_dir: Directory for the log file (None: keep current, default 'logs')
+        rotate: Size-based rotation (None: keep current, default True); the
+                multi-process server turns it off
+
+    Returns:
+        The shared AppLogger instance
+    """
+    global _app_logger
+    with _configure_lock:
+        if _app_logger is None:
+            _app_logger = AppLogger(log_dir or 'logs', True if rotate is None else rotate)
+        else:
+            _app_logger.update(log_dir, rotate)
+        return _app_logger
+
+
+def reopen_log_files():
+    """Make this process open its own log file (call in a worker after fork)"""
+    with _configure_lock:
+        if _app_logger is not None:
+            _app_logger.reopen()
@@ -0,0 +1,48 @@
+"""
+Request Deadlines for Weather App
+A page-level time budget shared by every upstream call made for one request
+"""
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a page's time budget runs out before upstream answers"""
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which a page must be done"""
+
+    def __init__(self, seconds: float):
+        """
+        Initialize Deadline
+
+        Args:
+            seconds: Budget starting now
+        """
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """
+        Timeout for the next blocking call
+
+        Args:
+            cap: Upper bound, e.g. a per-call timeout
+
+        Returns:
+            min(cap, remaining)
+        """
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f}s)"
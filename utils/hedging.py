@@ -0,0 +1,197 @@
+"""
+Hedged Upstream Requests for Weather App
+Duplicates a slow request after an adaptive delay and keeps the first answer
+
+The hedge delay tracks a high percentile of recent upstream latencies, so
+only the slowest few percent of calls are duplicated, and a token budget
+caps hedges to a fixed fraction of primary calls so hedging can never
+multiply upstream quota usage.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from utils.app_logger import logger
+from utils.deadline import Deadline, DeadlineExceeded
+
+
+class LatencyTracker:
+    """Rolling window of successful upstream latencies"""
+
+    def __init__(self, window: int = 200):
+        """
+        Initialize LatencyTracker
+
+        Args:
+            window: Number of recent samples kept
+        """
+        self._samples: 'deque[float]' = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency at the given percentile (0-100), None without samples"""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Token bucket allowing hedges for at most `ratio` of primary requests"""
+
+    def __init__(self, ratio: float = 0.05, burst: float = 5.0):
+        """
+        Initialize HedgeBudget
+
+        Args:
+            ratio: Tokens earned per primary request
+            burst: Maximum tokens saved up
+        """
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+        self.hedges = 0
+        self.denied = 0
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.hedges += 1
+                return True
+            self.denied += 1
+            return False
+
+
+class HedgedRequester:
+    """
+    Runs upstream attempts on a thread pool under a Deadline
+
+    The caller never waits past the deadline: if no attempt has answered
+    by then DeadlineExceeded is raised and any attempt still in flight is
+    told to abandon its response.
+    """
+
+    def __init__(self, hedging: bool = False, percentile: float = 95,
+                 min_delay: float = 0.05, default_delay: float = 1.0,
+                 min_samples: int = 20, budget: Optional[HedgeBudget] = None,
+                 max_workers: int = 32):
+        """
+        Initialize HedgedRequester
+
+        Args:
+            hedging: Send a duplicate attempt when the first one is slow
+            percentile: Latency percentile used as the hedge delay
+            min_delay: Lower bound on the hedge delay (seconds)
+            default_delay: Hedge delay until min_samples latencies are known
+            min_samples: Samples needed before the adaptive delay is used
+            budget: Hedge token budget (default: 5% of primaries)
+            max_workers: Threads available for in-flight attempts
+        """
+        self.hedging = hedging
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.budget = budget or HedgeBudget()
+        self.latencies = LatencyTracker()
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Created lazily (and again after fork) since threads do not survive fork
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='upstream')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the first attempt before hedging"""
+        if len(self.latencies) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, self.latencies.percentile(self.percentile))
+
+    def _attempt(self, send: Callable[[threading.Event], object], cancelled: threading.Event):
+        started = time.monotonic()
+        result = send(cancelled)
+        self.latencies.record(time.monotonic() - started)
+        return result
+
+    def call(self, send: Callable[[threading.Event], object], deadline: Deadline, label: str = 'upstream'):
+        """
+        Run `send` (and possibly one hedge) and return the first successful result
+
+        Args:
+            send: Performs one attempt; receives an Event that is set once the
+                  attempt has lost or been abandoned, and should then discard
+                  its response without reading it
+            deadline: Hard bound for the whole call
+            label: Description used in logs
+
+        Returns:
+            Result of the first attempt to succeed
+
+        Raises:
+            DeadlineExceeded: If nothing succeeded before the deadline
+            Exception: The error of the last failed attempt if all attempts failed
+        """
+        if deadline.expired():
+            raise DeadlineExceeded(f"No time left for {label}")
+
+        self.budget.earn()
+        cancelled = threading.Event()
+        pool = self._pool()
+        pending = {pool.submit(self._attempt, send, cancelled)}
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        try:
+            while True:
+                if self.hedging and not hedged:
+                    timeout = min(self.hedge_delay(), deadline.remaining())
+                else:
+                    timeout = deadline.remaining()
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    error = future.exception()
+                    if error is None:
+                        return future.result()
+                    last_error = error
+
+                if not pending:
+                    raise last_error
+                if deadline.expired():
+                    raise DeadlineExceeded(f"Deadline exceeded waiting for {label}")
+                if self.hedging and not hedged:
+                    hedged = True
+                    if deadline.remaining() > self.min_delay and self.budget.try_spend():
+                        logger.info(f"Hedging slow {label} request after {timeout * 1000:.0f} ms")
+                        pending.add(pool.submit(self._attempt, send, cancelled))
+        finally:
+            # Losers (or attempts abandoned at the deadline) drop their responses
+            cancelled.set()
+            for future in pending:
+                future.cancel()
@@ -8,13 +8,25 @@ from datetime import datetime
 
 LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 
-logs_path = os.path.join(os.getcwd(), "logs", LOG_FILE)
-os.makedirs(logs_path, exist_ok=True)
+logs_path = os.path.join(os.getcwd(), "logs")
 
 LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
 
+
+class _DeferredFileHandler(logging.FileHandler):
+    """File handler that creates the logs directory on first write"""
+
+    def _open(self):
+        os.makedirs(logs_path, exist_ok=True)
+        return super()._open()
+
+
+_file_handler = _DeferredFileHandler(LOG_FILE_PATH, delay=True)
+_file_handler.setFormatter(logging.Formatter(
+    "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
+))
+
 logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
+    handlers=[_file_handler],
     level=logging.INFO,
 )
@@ -0,0 +1,242 @@
+"""
+Request Profiling Utilities for Weather App
+Per-request cProfile capture and an on-demand wall-clock stack sampler
+
+Captures live in the memory of the worker process that took them, and every
+entry reports its pid. Under the multi-worker server, admin calls land on
+arbitrary workers, so profile with a single worker (serve.py --workers 1).
+"""
+
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from utils.app_logger import logger
+
+# cProfile is process-wide on Python 3.12+ (sys.monitoring allows one active
+# profiler and it sees every thread), so at most one capture runs at a time
+_PROFILE_LOCK = threading.Lock()
+
+
+class RequestProfiler:
+    """Captures cProfile data for a sampled fraction of requests"""
+
+    def __init__(self, sample_rate: float = 0.0, max_profiles: int = 50):
+        """
+        Initialize RequestProfiler
+
+        Args:
+            sample_rate: Fraction of requests (0.0-1.0) profiled automatically
+            max_profiles: Number of recent profiles kept in memory
+        """
+        self.sample_rate = sample_rate
+        self._profiles: 'deque[Dict]' = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        """Decide whether the current request is picked by random sampling"""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """
+        Start profiling the calling thread
+
+        Returns:
+            The running profile, or None if another capture (or another
+            profiling tool) is active - the request is then not profiled
+        """
+        if not _PROFILE_LOCK.acquire(blocking=False):
+            logger.debug("Skipping request profile: another capture is running")
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            _PROFILE_LOCK.release()
+            logger.warning(f"Skipping request profile: {e}")
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, label: str, wall_ms: float) -> int:
+        """
+        Stop a profile and store its results
+
+        Args:
+            profile: Profile returned by start()
+            label: Description such as 'POST /weather'
+            wall_ms: Wall-clock duration of the request
+
+        Returns:
+            ID of the stored profile
+        """
+        try:
+            profile.disable()
+        finally:
+            _PROFILE_LOCK.release()
+        profile.create_stats()
+        entry = {
+            'id': next(self._ids),
+            'pid': os.getpid(),
+            # On 3.12+ the capture also includes other threads active meanwhile
+            'all_threads': sys.version_info >= (3, 12),
+            'label': label,
+            'wall_ms': round(wall_ms, 2),
+            'captured_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'stats': profile.stats,
+        }
+        with self._lock:
+            self._profiles.append(entry)
+        logger.info(f"Captured request profile #{entry['id']} for {label} ({entry['wall_ms']} ms)")
+        return entry['id']
+
+    def list_profiles(self) -> List[Dict]:
+        """Summaries of the stored profiles, newest first"""
+        with self._lock:
+            return [
+                {k: v for k, v in entry.items() if k != 'stats'}
+                for entry in reversed(self._profiles)
+            ]
+
+    def _get(self, profile_id: int) -> Optional[Dict]:
+        with self._lock:
+            for entry in self._profiles:
+                if entry['id'] == profile_id:
+                    return entry
+        return None
+
+    def report(self, profile_id: int, sort: str = 'cumulative', limit: int = 40) -> Optional[str]:
+        """Human-readable pstats report for a stored profile"""
+        entry = self._get(profile_id)
+        if entry is None:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsSource(entry['stats']), stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return f"{entry['label']} - {entry['wall_ms']} ms\n\n{stream.getvalue()}"
+
+    def dump(self, profile_id: int) -> Optional[bytes]:
+        """Raw stats in the .pstats format read by pstats, snakeviz, etc."""
+        entry = self._get(profile_id)
+        if entry is None:
+            return None
+        return marshal.dumps(entry['stats'])
+
+
+class _StatsSource:
+    """Adapter letting pstats.Stats load an already collected stats dict"""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class StackSampler:
+    """
+    Wall-clock sampler of every thread's Python stack
+
+    While running, a background thread snapshots sys._current_frames() at a
+    fixed interval and counts identical stacks. Nothing is installed in the
+    interpreter, so request threads pay nothing; when stopped the thread
+    exits. Output uses the collapsed-stack format consumed by flamegraph.pl
+    and speedscope.
+    """
+
+    def __init__(self):
+        """Initialize StackSampler"""
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.ends_at: Optional[float] = None
+        self.interval = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, interval: float = 0.005) -> bool:
+        """
+        Sample for `duration` seconds, replacing the previous capture
+
+        Args:
+            duration: Seconds to sample
+            interval: Seconds between samples
+
+        Returns:
+            False if a capture is already running
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._counts = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self.ends_at = self.started_at + duration
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration, interval),
+                                            name='stack-sampler', daemon=True)
+            self._thread.start()
+        logger.info(f"Stack sampler started for {duration}s at {interval * 1000:.1f} ms interval")
+        return True
+
+    def stop(self) -> None:
+        """Stop a running capture early"""
+        self._stop.set()
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+    def _run(self, duration: float, interval: float) -> None:
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            stacks = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_label(frame))
+                    frame = frame.f_back
+                stacks.append(';'.join(reversed(stack)))
+            del frames
+            with self._lock:
+                self._counts.update(stacks)
+                self.samples += 1
+            self._stop.wait(interval)
+        logger.info(f"Stack sampler finished with {self.samples} samples")
+
+    def collapsed(self) -> str:
+        """Collapsed stacks ('frame;frame;frame count' per line)"""
+        with self._lock:
+            return '\n'.join(f"{stack} {count}" for stack, count in self._counts.most_common()) + '\n'
+
+    def status(self) -> Dict:
+        """Summary of the current or last capture"""
+        return {
+            'pid': os.getpid(),
+            'running': self.running,
+            'samples': self.samples,
+            'distinct_stacks': len(self._counts),
+            'interval_ms': round(self.interval * 1000, 2),
+            'started_at': self.started_at,
+            'ends_at': self.ends_at,
+        }
@@ -0,0 +1,158 @@
+"""
+Unit and Locale Formatting for Weather App
+Converts canonical metric values at render time
+
+WeatherService always fetches and caches metric payloads, so unit
+preferences never multiply upstream calls or cache entries. Each
+supported combination of preferences maps to one immutable UnitFormatter
+built once and reused.
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+
+# unit -> (label, scale, offset, decimals); display = metric * scale + offset
+TEMPERATURE_UNITS: Dict[str, Tuple[str, float, float, int]] = {
+    'metric': ('°C', 1.0, 0.0, 1),
+    'imperial': ('°F', 1.8, 32.0, 1),
+    'kelvin': ('K', 1.0, 273.15, 2),
+}
+
+WIND_UNITS: Dict[str, Tuple[str, float, float, int]] = {
+    'ms': ('m/s', 1.0, 0.0, 1),
+    'kmh': ('km/h', 3.6, 0.0, 1),
+    'mph': ('mph', 2.2369362920544, 0.0, 1),
+}
+
+PRESSURE_UNITS: Dict[str, Tuple[str, float, float, int]] = {
+    'hpa': ('hPa', 1.0, 0.0, 0),
+    'inhg': ('inHg', 0.029529983071445, 0.0, 2),
+}
+
+# locale -> (decimal separator, thousands separator)
+LOCALES: Dict[str, Tuple[str, str]] = {
+    'en': ('.', ','),
+    'de': (',', '.'),
+    'fr': (',', ' '),
+}
+
+DEFAULT_PREFERENCES = {
+    'temperature': 'metric',
+    'wind': 'ms',
+    'pressure': 'hpa',
+    'locale': 'en',
+}
+
+PREFERENCE_OPTIONS = {
+    'temperature': TEMPERATURE_UNITS,
+    'wind': WIND_UNITS,
+    'pressure': PRESSURE_UNITS,
+    'locale': LOCALES,
+}
+
+
+def normalize_preferences(prefs: Optional[Dict]) -> Dict[str, str]:
+    """
+    Fill in defaults and drop unsupported values
+
+    Args:
+        prefs: Raw preferences (e.g. from the session or a form)
+
+    Returns:
+        Complete, valid preferences dict
+    """
+    prefs = prefs or {}
+    return {
+        key: prefs.get(key) if prefs.get(key) in PREFERENCE_OPTIONS[key] else default
+        for key, default in DEFAULT_PREFERENCES.items()
+    }
+
+
+class UnitFormatter:
+    """Formats canonical metric values for one set of unit/locale preferences"""
+
+    def __init__(self, temperature: str, wind: str, pressure: str, locale: str):
+        """
+        Initialize UnitFormatter
+
+        Args:
+            temperature: Key of TEMPERATURE_UNITS
+            wind: Key of WIND_UNITS
+            pressure: Key of PRESSURE_UNITS
+            locale: Key of LOCALES
+        """
+        self._temperature = TEMPERATURE_UNITS[temperature]
+        self._wind = WIND_UNITS[wind]
+        self._pressure = PRESSURE_UNITS[pressure]
+        self._decimal, self._thousands = LOCALES[locale]
+        self.temperature_label = self._temperature[0]
+        self.wind_label = self._wind[0]
+        self.pressure_label = self._pressure[0]
+        self.preferences = {'temperature': temperature, 'wind': wind, 'pressure': pressure, 'locale': locale}
+
+    def number(self, value, decimals: int = 1) -> str:
+        """Format a number with the locale's separators"""
+        try:
+            text = f"{float(value):,.{decimals}f}"
+        except (TypeError, ValueError):
+            return str(value)
+        if self._decimal == '.':
+            return text
+        return text.replace(',', '\0').replace('.', self._decimal).replace('\0', self._thousands)
+
+    def _convert(self, value, unit: Tuple[str, float, float, int]) -> str:
+        _label, scale, offset, decimals = unit
+        try:
+            return self.number(float(value) * scale + offset, decimals)
+        except (TypeError, ValueError):
+            return str(value)
+
+    def temperature(self, celsius) -> str:
+        """Temperature value (no unit label)"""
+        return self._convert(celsius, self._temperature)
+
+    def wind(self, meters_per_second) -> str:
+        """Wind speed value (no unit label)"""
+        return self._convert(meters_per_second, self._wind)
+
+    def pressure(self, hectopascal) -> str:
+        """Pressure value (no unit label)"""
+        return self._convert(hectopascal, self._pressure)
+
+
+    def to_metric(self, kind: str, value: float) -> float:
+        """
+        Convert a value entered in the user's units back to canonical metric
+
+        Args:
+            kind: 'temperature', 'wind' or 'pressure' (anything else is returned unchanged)
+            value: Value in the user's unit
+
+        Returns:
+            Value in metric units
+        """
+        unit = {'temperature': self._temperature, 'wind': self._wind, 'pressure': self._pressure}.get(kind)
+        if unit is None:
+            return float(value)
+        _label, scale, offset, _decimals = unit
+        return (float(value) - offset) / scale
+
+
+@lru_cache(maxsize=None)
+def _formatter(temperature: str, wind: str, pressure: str, locale: str) -> UnitFormatter:
+    return UnitFormatter(temperature, wind, pressure, locale)
+
+
+def get_formatter(prefs: Optional[Dict] = None) -> UnitFormatter:
+    """
+    Return the shared UnitFormatter for a set of preferences
+
+    Args:
+        prefs: Raw preferences; missing or invalid values fall back to defaults
+
+    Returns:
+        Cached UnitFormatter
+    """
+    prefs = normalize_preferences(prefs)
+    return _formatter(prefs['temperature'], prefs['wind'], prefs['pressure'], prefs['locale'])